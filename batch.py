@@ -0,0 +1,222 @@
+# Parallel headless batch runner for balance and difficulty sweeps.
+#
+# Plays many seeded games across a multiprocessing worker pool, each with an
+# input policy and optional difficulty tuning (see game.TUNING). Results are
+# streamed to CSV as workers finish, and survival time, wave, score and
+# per-weapon kill rates are aggregated into a summary table at the end.
+#
+#   python batch.py --games 2000 --policy random --out results.csv
+#   python batch.py --games 500 --set power_up_chance=0.5 --set spawn_interval_min=30
+#   python batch.py --games 500 --snapshot wave3.snap   fork games from a saved state
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+# Otherwise SDL turns SIGTERM into a quit event and Pool.terminate() hangs
+# waiting for workers that never exit
+os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+
+from game import (FPS, INPUT_DOWN, INPUT_FIRE, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, TUNING,
+                  Game)
+import snapshot
+
+MOVES = (0, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN,
+         INPUT_LEFT | INPUT_UP, INPUT_RIGHT | INPUT_UP,
+         INPUT_LEFT | INPUT_DOWN, INPUT_RIGHT | INPUT_DOWN)
+
+
+def fire_policy(game, rng):
+    # Stand still and fire every tick
+    while True:
+        yield INPUT_FIRE
+
+
+def random_policy(game, rng):
+    # Fire constantly and hold a random direction for 10-40 ticks at a time
+    while True:
+        move = rng.choice(MOVES)
+        for _ in range(rng.randint(10, 40)):
+            yield move | INPUT_FIRE
+
+
+def scripted_policy(game, rng):
+    # Track the closest enemy horizontally and dodge enemy bullets close above
+    player = game.player
+    while True:
+        inputs = INPUT_FIRE
+        target = None
+        for enemy in game.enemies:
+            if target is None or enemy.y > target.y:
+                target = enemy
+        if target is not None:
+            if target.x < player.x - 10:
+                inputs |= INPUT_LEFT
+            elif target.x > player.x + 10:
+                inputs |= INPUT_RIGHT
+        for hit in game.enemy_bullets.hits(player.x, player.y - 40, 30, 40):
+            inputs &= ~(INPUT_LEFT | INPUT_RIGHT)
+            inputs |= INPUT_LEFT if game.enemy_bullets.x[hit] > player.x else INPUT_RIGHT
+        yield inputs
+
+
+POLICIES = {
+    "fire": fire_policy,
+    "random": random_policy,
+    "scripted": scripted_policy,
+}
+
+
+# Snapshot every game starts from, set in each worker by load_start()
+start_state = None
+
+
+def load_start(blob):
+    global start_state
+    start_state = blob
+
+
+def play(job):
+    # Worker: play one game to game over or for max_ticks and return its
+    # stats. Games forked from a snapshot are made to diverge by reseeding
+    # the game's random generator with the job's seed.
+    seed, policy, max_ticks, tuning = job
+    if start_state is None:
+        game = Game(seed, tuning)
+    else:
+        game = snapshot.restore(start_state)
+        game.apply_tuning(tuning)
+        game.rng.seed(seed)
+    inputs = POLICIES[policy](game, random.Random(seed ^ 0x5EED))
+    end = game.ticks + max_ticks
+    while not game.game_over and game.ticks < end:
+        game.tick(next(inputs))
+    return {
+        "seed": seed,
+        "ticks": game.ticks,
+        "survival_s": game.ticks / FPS,
+        "wave": game.wave,
+        "score": game.score,
+        "kills": sum(game.kills_by_weapon.values()),
+        "game_over": game.game_over,
+        "kills_by_weapon": game.kills_by_weapon,
+        "weapon_ticks": game.weapon_ticks,
+    }
+
+
+def parse_setting(text):
+    # "name=value" with a JSON value, e.g. power_up_chance=0.5 or
+    # weapon_overrides={"Spread": {"damage": 8}}
+    name, sep, value = text.partition("=")
+    if not sep or name not in TUNING:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE with NAME one of {', '.join(TUNING)}")
+    try:
+        return name, json.loads(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{name}: value is not valid JSON")
+
+
+class Summary:
+    # Running aggregates, updated as each result arrives
+    def __init__(self):
+        self.games = 0
+        self.finished = 0
+        self.totals = {"survival_s": 0.0, "wave": 0, "score": 0, "kills": 0}
+        self.best = {"survival_s": 0.0, "wave": 0, "score": 0}
+        self.kills_by_weapon = {}
+        self.weapon_ticks = {}
+
+    def add(self, result):
+        self.games += 1
+        self.finished += result["game_over"]
+        for key in self.totals:
+            self.totals[key] += result[key]
+        for key in self.best:
+            self.best[key] = max(self.best[key], result[key])
+        for weapon, kills in result["kills_by_weapon"].items():
+            self.kills_by_weapon[weapon] = self.kills_by_weapon.get(weapon, 0) + kills
+        for weapon, ticks in result["weapon_ticks"].items():
+            self.weapon_ticks[weapon] = self.weapon_ticks.get(weapon, 0) + ticks
+
+    def lines(self):
+        n = max(self.games, 1)
+        lines = [
+            f"{self.games} games, {self.finished} ended in game over",
+            f"{'':<12}{'mean':>10}{'best':>10}",
+        ]
+        for key in self.totals:
+            best = f"{self.best[key]:>10.1f}" if key in self.best else ""
+            lines.append(f"{key:<12}{self.totals[key] / n:>10.1f}{best}")
+        lines.append("")
+        lines.append(f"{'weapon':<12}{'kills':>10}{'share':>10}{'held s':>10}{'kills/s':>10}")
+        total_kills = max(sum(self.kills_by_weapon.values()), 1)
+        for weapon in sorted(set(self.kills_by_weapon) | set(self.weapon_ticks)):
+            kills = self.kills_by_weapon.get(weapon, 0)
+            held = self.weapon_ticks.get(weapon, 0) / FPS
+            rate = f"{kills / held:>10.3f}" if held else f"{'-':>10}"
+            lines.append(f"{weapon:<12}{kills:>10}{kills / total_kills:>10.1%}{held:>10.0f}{rate}")
+        return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play seeded Pixel Shooter games in parallel")
+    parser.add_argument("--games", type=int, default=1000, help="number of games (default 1000)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--policy", choices=POLICIES, default="random", help="input policy (default random)")
+    parser.add_argument("--max-ticks", type=int, default=FPS * 600,
+                        help="stop a game after playing this many ticks (default 10 minutes)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game; the rest follow")
+    parser.add_argument("--set", type=parse_setting, action="append", default=[], metavar="NAME=VALUE",
+                        help="override a difficulty parameter from game.TUNING (repeatable)")
+    parser.add_argument("--snapshot", metavar="PATH",
+                        help="start every game from a state saved by snapshot.py instead of tick 0")
+    parser.add_argument("--out", metavar="PATH", help="stream per-game results to PATH as CSV")
+    args = parser.parse_args()
+    blob = None
+    if args.snapshot:
+        with open(args.snapshot, "rb") as f:
+            blob = f.read()
+
+    tuning = dict(args.set)
+    jobs = [(args.seed + i, args.policy, args.max_ticks, tuning) for i in range(args.games)]
+    summary = Summary()
+    out = open(args.out, "w", newline="") if args.out else None
+    writer = None
+    start = time.perf_counter()
+    try:
+        with multiprocessing.Pool(args.workers, load_start, (blob,)) as pool:
+            # Small chunks keep results streaming without paying IPC per game
+            chunksize = max(1, min(16, args.games // (args.workers * 8)))
+            for result in pool.imap_unordered(play, jobs, chunksize):
+                summary.add(result)
+                if out is not None:
+                    if writer is None:
+                        writer = csv.writer(out)
+                        writer.writerow(["seed", "ticks", "survival_s", "wave", "score", "kills",
+                                         "game_over", "kills_by_weapon"])
+                    writer.writerow([result["seed"], result["ticks"], f"{result['survival_s']:.2f}",
+                                     result["wave"], result["score"], result["kills"],
+                                     int(result["game_over"]), json.dumps(result["kills_by_weapon"])])
+                    out.flush()
+                if sys.stderr.isatty():
+                    print(f"\r{summary.games}/{args.games} games", end="", file=sys.stderr)
+    finally:
+        if out is not None:
+            out.close()
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f"{args.games} games in {elapsed:.1f}s with {args.workers} workers")
+    print("\n".join(summary.lines()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# Stress-scenario benchmarks for simulation and rendering throughput.
+#
+# Each scenario builds a synthetic Game state and times Game.tick,
+# Game.check_collisions and Game.draw separately on fresh copies of that
+# state, then measures peak traced memory in a separate run. Results can be
+# saved as a baseline and compared on later commits:
+#
+#   python bench.py --save-baseline bench_baseline.json
+#   python bench.py --compare bench_baseline.json --threshold 0.15
+#
+# --compare exits with status 1 if any timing is slower than the baseline by
+# more than the threshold. Startup cost is tracked too: the time to import
+# game and reach the first simulated tick in a fresh interpreter.
+
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from game import (WIDTH, HEIGHT, INPUT_FIRE, RED, PINK, Bullet, Enemy, Game, LaserBeam,
+                  PowerUp, POWER_UP_TYPES, RailgunBeam, WHITE)
+
+SEED = 1234
+
+
+def add_enemies(game, rng, count, bullets_each=0):
+    for _ in range(count):
+        enemy = Enemy(rng.randint(20, WIDTH - 20), rng.randint(0, HEIGHT - 150),
+                      rng.choice(["basic", "fast", "tank"]))
+        # Enemies survive every hit so the workload stays constant
+        enemy.health = enemy.max_health = 10**9
+        for _ in range(bullets_each):
+            game.enemy_bullets.emit(enemy.x + rng.uniform(-10, 10), rng.uniform(0, HEIGHT), 0, 5, 5, RED)
+        game.add_enemy(enemy)
+
+
+def bullet_storm(rng):
+    game = Game(SEED)
+    add_enemies(game, rng, 200)
+    for _ in range(10000):
+        game.bullets.append(Bullet.spawn(rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT),
+                                         rng.uniform(-2, 2), -10, 10, WHITE))
+    return game
+
+
+def enemy_swarm(rng):
+    game = Game(SEED)
+    add_enemies(game, rng, 1000, bullets_each=3)
+    game.player.invincible = 10**9
+    return game
+
+
+def particle_storm(rng):
+    game = Game(SEED)
+    for _ in range(1000):
+        game.particles.emit(rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT), rng.choice([RED, PINK, WHITE]), 20)
+    return game
+
+
+def beam_barrage(rng):
+    game = Game(SEED)
+    add_enemies(game, rng, 500)
+    for i in range(100):
+        beam_class = LaserBeam if i % 2 else RailgunBeam
+        beam = beam_class.spawn(rng.uniform(0, WIDTH), HEIGHT - 100, 25, RED)
+        beam.timer = 10**9  # Stay active for the whole run
+        game.bullets.append(beam)
+    return game
+
+
+def spread_storm(rng):
+    # Spread weapon with no cooldown fired every tick into a dense wave
+    game = Game(SEED)
+    add_enemies(game, rng, 300, bullets_each=1)
+    for _ in range(20):
+        game.power_ups.append(PowerUp(rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT), rng.choice(POWER_UP_TYPES)))
+    game.player.invincible = 10**9
+    game.player.weapon = "Spread"
+    game.player.weapons["Spread"] = dict(game.player.weapons["Spread"], fire_rate=math.inf)
+    game.step(60, INPUT_FIRE)
+    return game
+
+
+SCENARIOS = {
+    "bullet_storm": bullet_storm,
+    "enemy_swarm": enemy_swarm,
+    "particle_storm": particle_storm,
+    "beam_barrage": beam_barrage,
+    "spread_storm": spread_storm,
+}
+
+
+def build(name):
+    return SCENARIOS[name](random.Random(SEED))
+
+
+def time_calls(name, fn, ticks):
+    # Mean milliseconds per call over `ticks` calls on a fresh state
+    game = build(name)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        fn(game)
+    return (time.perf_counter() - start) * 1000 / ticks
+
+
+def run_scenario(name, ticks, screen):
+    def update(game):
+        # Whole ticks, so the clock advances and scheduled events come due
+        game.tick(INPUT_FIRE if name == "spread_storm" else 0)
+
+    def draw(game):
+        game.draw(screen)
+
+    result = {
+        "update_ms": time_calls(name, update, ticks),
+        "check_collisions_ms": time_calls(name, Game.check_collisions, ticks),
+        "draw_ms": time_calls(name, draw, ticks),
+    }
+    result["ticks_per_s"] = 1000 / result["update_ms"]
+    result["frame_ms"] = result["update_ms"] + result["draw_ms"]
+
+    # Peak memory of building the state and running it, measured separately
+    # because tracing slows everything down
+    tracemalloc.start()
+    game = build(name)
+    for _ in range(ticks):
+        update(game)
+        draw(game)
+    result["peak_mib"] = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return result
+
+
+STARTUP_CODE = """
+import time
+start = time.perf_counter()
+import game
+imported = time.perf_counter()
+game.Game(1).tick()
+print((imported - start) * 1000, (time.perf_counter() - start) * 1000)
+"""
+
+
+def measure_startup(runs=5):
+    # Medians over fresh interpreters: import time of game, time until the
+    # first tick (which loads numpy for the particles) and the wall time of
+    # the whole process, roughly what a spawned worker pays before playing
+    imports, first_ticks, processes = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", STARTUP_CODE], capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        processes.append((time.perf_counter() - start) * 1000)
+        import_ms, first_tick_ms = map(float, out.stdout.split()[-2:])
+        imports.append(import_ms)
+        first_ticks.append(first_tick_ms)
+    return {
+        "import_ms": statistics.median(imports),
+        "first_tick_ms": statistics.median(first_ticks),
+        "process_ms": statistics.median(processes),
+    }
+
+
+# Metrics where a larger value is a regression
+TIMINGS = ("update_ms", "check_collisions_ms", "draw_ms", "frame_ms", "import_ms", "first_tick_ms", "process_ms")
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in TIMINGS + ("peak_mib",):
+            if metric not in base or metric not in metrics or base[metric] <= 0:
+                continue
+            change = metrics[metric] / base[metric] - 1
+            flag = ""
+            if change > threshold and metric in TIMINGS:
+                flag = "  REGRESSION"
+                regressions.append((name, metric, change))
+            print(f"  {name:<16}{metric:<22}{base[metric]:>10.3f} -> {metrics[metric]:>10.3f} ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pixel Shooter stress benchmarks")
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO",
+                        help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--ticks", type=int, default=30, help="ticks or frames timed per measurement")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write results to PATH as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown that counts as a regression (default 0.10)")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    pygame.display.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    results = {}
+    if not args.scenarios:
+        r = results["startup"] = measure_startup()
+        print(f"startup: import {r['import_ms']:.1f} ms, first tick {r['first_tick_ms']:.1f} ms, "
+              f"process {r['process_ms']:.0f} ms\n")
+    print(f"{'scenario':<16}{'update ms':>11}{'collide ms':>12}{'draw ms':>10}{'frame ms':>10}"
+          f"{'ticks/s':>10}{'peak MiB':>10}")
+    for name in args.scenarios or SCENARIOS:
+        r = results[name] = run_scenario(name, args.ticks, screen)
+        print(f"{name:<16}{r['update_ms']:>11.3f}{r['check_collisions_ms']:>12.3f}{r['draw_ms']:>10.3f}"
+              f"{r['frame_ms']:>10.3f}{r['ticks_per_s']:>10.0f}{r['peak_mib']:>10.1f}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nAgainst {args.compare}:")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
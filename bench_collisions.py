@@ -0,0 +1,98 @@
+# Benchmark for Game.check_collisions with the spatial-hash broadphase.
+#
+# Builds games with B player bullets and E enemies spread over the screen and
+# times one collision pass, next to the same pass forced onto the grid and the
+# old nested-loop pass over the same state for comparison. Small cases (a
+# normal game has about a dozen entities) take the direct-scan path and large
+# ones the grid. Enemies are given huge health so every iteration sees the
+# same workload.
+#
+#   python bench_collisions.py [--cases 6x3 1000x500 10000x500]
+
+import argparse
+import random
+import time
+
+import game as game_module
+from game import BROADPHASE_MIN_PAIRS, WIDTH, HEIGHT, Bullet, Enemy, Game, LaserBeam, RailgunBeam, WHITE
+
+
+def make_game(n_bullets, n_enemies, seed=0):
+    rng = random.Random(seed)
+    game = Game()
+    game.player.x, game.player.y = -1000, -1000  # Keep the player out of the way
+    for _ in range(n_enemies):
+        enemy = Enemy(rng.randint(0, WIDTH), rng.randint(0, HEIGHT), rng.choice(["basic", "fast", "tank"]))
+        enemy.health = enemy.max_health = 10**9
+        game.enemies.append(enemy)
+    for _ in range(n_bullets):
+        game.bullets.append(Bullet(rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT), 0, -10, 10, WHITE))
+    return game
+
+
+def naive_bullet_pass(game):
+    # The nested bullets x enemies loop used before the broadphase. It covers
+    # only player bullets, while check_collisions also runs the other phases.
+    for bullet in game.bullets[:]:
+        if isinstance(bullet, (LaserBeam, RailgunBeam)):
+            continue
+        for enemy in game.enemies[:]:
+            if (abs(bullet.x - enemy.x) < (bullet.radius + enemy.width//2) and
+                abs(bullet.y - enemy.y) < (bullet.radius + enemy.height//2)):
+                enemy.take_damage(bullet.damage)
+                if bullet in game.bullets:
+                    game.bullets.remove(bullet)
+                break
+
+
+def grid_pass(game):
+    # check_collisions with the grid used however few entities there are
+    min_pairs = game_module.BROADPHASE_MIN_PAIRS
+    game_module.BROADPHASE_MIN_PAIRS = 0
+    try:
+        game.check_collisions()
+    finally:
+        game_module.BROADPHASE_MIN_PAIRS = min_pairs
+
+
+def time_pass(game, fn, repeat, number=1):
+    # Best of repeat runs of number passes, in ms per pass
+    bullets = list(game.bullets)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            game.bullets[:] = bullets
+            fn()
+        best = min(best, time.perf_counter() - start)
+    game.bullets[:] = bullets
+    return best / number * 1000
+
+
+def parse_case(text):
+    bullets, enemies = text.lower().split("x")
+    return int(bullets), int(enemies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Game.check_collisions")
+    parser.add_argument("--cases", type=parse_case, nargs="+", default=[(6, 3), (40, 20), (1000, 500), (10000, 500)],
+                        metavar="BxE", help="bullets x enemies per case")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'bullets':>8} {'enemies':>8} {'path':>6} {'pass ms':>10} {'grid ms':>10} {'naive ms':>10} {'vs grid':>8} {'vs naive':>9}")
+    for n_bullets, n_enemies in args.cases:
+        game = make_game(n_bullets, n_enemies)
+        path = "grid" if n_bullets * n_enemies >= BROADPHASE_MIN_PAIRS else "scan"
+        # Enough passes per run to time the small cases reliably
+        number = max(1, 20000 // (n_bullets + n_enemies))
+        pass_ms = time_pass(game, game.check_collisions, args.repeat, number)
+        grid_ms = time_pass(game, lambda: grid_pass(game), args.repeat, number)
+        naive_ms = time_pass(game, lambda: naive_bullet_pass(game), max(1, args.repeat // 5), number)
+        print(f"{n_bullets:>8} {n_enemies:>8} {path:>6} {pass_ms:>10.3f} {grid_ms:>10.3f} {naive_ms:>10.3f} "
+              f"{grid_ms / pass_ms:>7.1f}x {naive_ms / pass_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
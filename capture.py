@@ -0,0 +1,138 @@
+# Recording frames to disk without stalling the game loop.
+#
+# FrameRecorder.capture() copies a frame into one of a fixed pool of
+# preallocated surfaces (a single blit) and queues it for a background
+# thread that writes it out, as numbered PNG files or appended to one raw
+# video stream. When every buffer is still waiting to be written the frame
+# is dropped rather than waiting for the disk, and with a budget set a frame
+# is also dropped when copying it would take the frame over budget. Offline
+# recordings (drop=False) wait for a buffer instead and keep every frame.
+#
+# Raw frames are 32-bit BGRX rows without padding, e.g.
+#
+#   ffmpeg -f rawvideo -pixel_format bgr0 -video_size 800x600 -framerate 60 \
+#       -i capture/frames.raw capture.mp4
+#
+# frames.txt lists the frame number of each raw frame (or PNG written), so
+# dropped frames show up as gaps.
+
+import os
+import queue
+import threading
+import time
+
+from lazy import lazy_import
+
+pygame = lazy_import("pygame")
+
+FORMATS = ("png", "raw")
+
+
+class FrameRecorder:
+    def __init__(self, directory, every=1, fmt="png", buffers=8, budget_ms=None, drop=True):
+        # Captures every Nth frame offered to capture() into directory
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown capture format {fmt!r}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.every = every
+        self.fmt = fmt
+        self.n_buffers = buffers
+        self.budget_ms = budget_ms
+        self.drop = drop
+        self.copy_ms = 0.0  # Moving average of the cost of one capture
+        self.free = queue.SimpleQueue()
+        self.pending = queue.SimpleQueue()
+        self.size = None
+        self.frames = 0
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+        self.index = open(os.path.join(directory, "frames.txt"), "w")
+        self.thread = threading.Thread(target=self.run, name="capture", daemon=True)
+        self.thread.start()
+
+    def _allocate(self, size):
+        for _ in range(self.n_buffers):
+            self.free.put(pygame.Surface(size, 0, 32))
+        self.size = size
+
+    def due(self):
+        # Whether the next frame offered will be kept, so callers can skip
+        # drawing the others
+        return self.frames % self.every == 0
+
+    def capture(self, surface, elapsed_ms=None):
+        # Offer a frame; elapsed_ms is the work time of the frame so far.
+        # Returns True when the frame was queued for writing.
+        frame = self.frames
+        self.frames += 1
+        if frame % self.every:
+            return False
+        if self.error is not None or not self.thread.is_alive():
+            # The writer has stopped; nothing will free a buffer again
+            self.dropped += 1
+            return False
+        if self.size is None:
+            self._allocate(surface.get_size())
+        if (self.budget_ms is not None and elapsed_ms is not None
+                and elapsed_ms + self.copy_ms > self.budget_ms):
+            self.dropped += 1
+            return False
+        while True:
+            # Without drop, wait for the writer, but give up if it stops
+            try:
+                buffer = self.free.get(block=not self.drop, timeout=0.1)
+                break
+            except queue.Empty:
+                if self.drop or self.error is not None or not self.thread.is_alive():
+                    self.dropped += 1
+                    return False
+        start = time.perf_counter()
+        if surface.get_size() == self.size:
+            buffer.blit(surface, (0, 0))
+        else:
+            pygame.transform.scale(surface, self.size, buffer)
+        self.pending.put((frame, buffer))
+        self.copy_ms += ((time.perf_counter() - start) * 1000 - self.copy_ms) * 0.1
+        return True
+
+    def run(self):
+        index = self.index
+        stream = None
+        try:
+            while True:
+                item = self.pending.get()
+                if item is None:
+                    return
+                frame, buffer = item
+                try:
+                    if self.error is None:
+                        if self.fmt == "png":
+                            pygame.image.save(buffer, os.path.join(self.directory, f"frame-{frame:06d}.png"))
+                        else:
+                            if stream is None:
+                                stream = open(os.path.join(self.directory, "frames.raw"), "wb")
+                            stream.write(buffer.get_buffer())
+                        index.write(f"{frame}\n")
+                        self.written += 1
+                except (OSError, pygame.error) as error:
+                    # Keep draining the queue so capture() never blocks
+                    self.error = error
+                finally:
+                    self.free.put(buffer)
+        finally:
+            index.close()
+            if stream is not None:
+                stream.close()
+
+    def close(self):
+        # Write out the queued frames and stop the writer thread
+        self.pending.put(None)
+        self.thread.join()
+
+    def summary(self):
+        text = f"captured {self.written} frames to {self.directory}, dropped {self.dropped}"
+        if self.error is not None:
+            text += f" (stopped writing: {self.error})"
+        return text
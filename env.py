@@ -0,0 +1,402 @@
+# Gym-style environments for training agents.
+#
+# Env wraps one Game with reset()/step(action). An action is the input
+# bitmask of Game.tick (0-31), the reward is the score gained and an episode
+# ends at game over or after max_ticks. VectorEnv steps N games in lockstep
+# and returns batched NumPy arrays, resetting finished games automatically.
+# With workers > 0 the games are split across processes that write straight
+# into shared memory, so throughput scales with cores.
+#
+# Observations are flat float32 vectors of OBS_SIZE entity features: the
+# player, then up to MAX_ENEMIES enemies and MAX_ENEMY_BULLETS enemy bullets
+# (nearest to the player first), MAX_BULLETS player bullets and
+# MAX_POWER_UPS power-ups. Every entity slot starts with a presence flag and
+# empty slots are zero. Positions are scaled to [0, 1].
+#
+# PixelObserver is the alternative for pixel-based agents and visual tests:
+# it draws flat rectangles into a small offscreen surface (no window needed)
+# and returns a reusable NumPy view of its pixels. Pass one as Env's
+# observer to get frames instead of entity features.
+#
+#   python env.py --envs 64 --workers 4     measure steps/s with random actions
+
+import argparse
+import multiprocessing
+import os
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+# Otherwise SDL turns SIGTERM into a quit event and worker processes cannot
+# be stopped
+os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+
+import numpy as np
+
+import registry
+from game import FPS, HEIGHT, POWER_UP_TYPES, WIDTH, Bullet, Game, pygame
+from render_cache import unpack_color
+
+N_ACTIONS = 32
+
+WEAPONS = tuple(registry.WEAPONS)
+ENEMY_TYPES = tuple(registry.ENEMIES)
+
+# Feature scales, so speeds and timers land in [0, 1] whatever the content
+MAX_ENEMY_SPEED = max(enemy["speed"] for enemy in registry.ENEMIES.values())
+MAX_SHOT_SPEED = max(enemy["shot"]["speed"] for enemy in registry.ENEMIES.values())
+MAX_POWER_UP_TIME = max(power_up.get("duration", 1) for power_up in registry.POWER_UPS.values())
+
+MAX_ENEMIES = 16
+MAX_ENEMY_BULLETS = 32
+MAX_BULLETS = 16
+MAX_POWER_UPS = 8
+
+# Features per entity
+PLAYER_FEATURES = 5 + len(WEAPONS)  # x, y, health, invincible, power-up time, weapon
+ENEMY_FEATURES = 5 + len(ENEMY_TYPES)  # present, x, y, speed, health, type
+ENEMY_BULLET_FEATURES = 5  # present, x, y, dx, dy
+BULLET_FEATURES = 3  # present, x, y
+POWER_UP_FEATURES = 3 + len(POWER_UP_TYPES)  # present, x, y, type
+
+# Offsets of each section in an observation
+ENEMIES_AT = PLAYER_FEATURES
+ENEMY_BULLETS_AT = ENEMIES_AT + MAX_ENEMIES * ENEMY_FEATURES
+BULLETS_AT = ENEMY_BULLETS_AT + MAX_ENEMY_BULLETS * ENEMY_BULLET_FEATURES
+POWER_UPS_AT = BULLETS_AT + MAX_BULLETS * BULLET_FEATURES
+OBS_SIZE = POWER_UPS_AT + MAX_POWER_UPS * POWER_UP_FEATURES
+
+WEAPON_ONE_HOT = {name: tuple(float(i == j) for j in range(len(WEAPONS))) for i, name in enumerate(WEAPONS)}
+ENEMY_ONE_HOT = {name: tuple(float(i == j) for j in range(len(ENEMY_TYPES))) for i, name in enumerate(ENEMY_TYPES)}
+POWER_UP_ONE_HOT = {name: tuple(float(i == j) for j in range(len(POWER_UP_TYPES)))
+                    for i, name in enumerate(POWER_UP_TYPES)}
+
+
+def observe(game, out=None):
+    # Entity features of game as a float32 vector, written into out if given
+    if out is None:
+        out = np.empty(OBS_SIZE, np.float32)
+    out.fill(0)
+    player = game.player
+    px, py = player.x, player.y
+    out[:PLAYER_FEATURES] = (px / WIDTH, py / HEIGHT, player.health / player.max_health, player.invincible > 0,
+                             player.power_up_timer / MAX_POWER_UP_TIME) + WEAPON_ONE_HOT[player.weapon]
+
+    enemies = game.enemies
+    if enemies:
+        if len(enemies) > MAX_ENEMIES:
+            enemies = sorted(enemies, key=lambda e: (e.x - px) ** 2 + (e.y - py) ** 2)[:MAX_ENEMIES]
+        write(out, ENEMIES_AT, ENEMY_FEATURES,
+              [(1.0, e.x / WIDTH, e.y / HEIGHT, e.speed / MAX_ENEMY_SPEED, e.health / e.max_health)
+               + ENEMY_ONE_HOT[e.type]
+               for e in enemies])
+
+    store = game.enemy_bullets
+    n = len(store)
+    if n:
+        x = store.x[:n]
+        y = store.y[:n]
+        if n > MAX_ENEMY_BULLETS:
+            nearest = np.argsort((x - px) ** 2 + (y - py) ** 2, kind="stable")[:MAX_ENEMY_BULLETS]
+        else:
+            nearest = slice(None)
+        rows = out[ENEMY_BULLETS_AT:ENEMY_BULLETS_AT + MAX_ENEMY_BULLETS * ENEMY_BULLET_FEATURES].reshape(
+            MAX_ENEMY_BULLETS, ENEMY_BULLET_FEATURES)[:min(n, MAX_ENEMY_BULLETS)]
+        rows[:, 0] = 1
+        rows[:, 1] = x[nearest] / WIDTH
+        rows[:, 2] = y[nearest] / HEIGHT
+        rows[:, 3] = store.dx[:n][nearest] / MAX_SHOT_SPEED
+        rows[:, 4] = store.dy[:n][nearest] / MAX_SHOT_SPEED
+
+    if game.bullets:
+        write(out, BULLETS_AT, BULLET_FEATURES,
+              [(1.0, b.x / WIDTH, b.y / HEIGHT) for b in game.bullets[-MAX_BULLETS:]])
+
+    if game.power_ups:
+        write(out, POWER_UPS_AT, POWER_UP_FEATURES,
+              [(1.0, p.x / WIDTH, p.y / HEIGHT) + POWER_UP_ONE_HOT[p.type] for p in game.power_ups[:MAX_POWER_UPS]])
+    return out
+
+
+def write(out, start, features, rows):
+    # Write entity rows into the section of out starting at start
+    out[start:start + len(rows) * features].reshape(len(rows), features)[:] = rows
+
+
+class PixelObserver:
+    def __init__(self, width=84, height=84, grayscale=False):
+        # Grayscale frames use an 8-bit surface with a gray palette, so each
+        # colour is drawn directly as its luminance and no conversion pass
+        # is needed
+        self.width = width
+        self.height = height
+        self.grayscale = grayscale
+        self.sx = width / WIDTH
+        self.sy = height / HEIGHT
+        if grayscale:
+            self.surface = pygame.Surface((width, height), 0, 8)
+            self.surface.set_palette([(i, i, i) for i in range(256)])
+            # surfarray views are (x, y); transpose to the usual (row, column)
+            self.pixels = pygame.surfarray.pixels2d(self.surface).T
+        else:
+            self.surface = pygame.Surface((width, height), 0, 24)
+            self.pixels = pygame.surfarray.pixels3d(self.surface).transpose(1, 0, 2)
+        self.colors = {}
+
+    @property
+    def shape(self):
+        return self.pixels.shape
+
+    def color(self, key):
+        # Fill value for an RGB colour, or a packed 0xRRGGBB int, on this
+        # surface
+        value = self.colors.get(key)
+        if value is None:
+            rgb = unpack_color(key) if type(key) is int else key
+            if self.grayscale:
+                r, g, b = rgb
+                value = min(255, round(0.299 * r + 0.587 * g + 0.114 * b))
+            else:
+                value = self.surface.map_rgb(rgb)
+            self.colors[key] = value
+        return value
+
+    def box(self, rgb, x, y, width, height):
+        # Fill a scaled, at least one pixel wide rect with top-left at (x, y)
+        sx = self.sx
+        sy = self.sy
+        self.surface.fill(self.color(rgb), (int(x * sx), int(y * sy),
+                                            max(1, round(width * sx)), max(1, round(height * sy))))
+
+    def render(self, game):
+        # Clearing through the array view is much faster than Surface.fill
+        # on 8-bit surfaces
+        self.pixels.fill(0)
+        box = self.box
+        for power_up in game.power_ups:
+            box(power_up.color, power_up.x - power_up.width / 2, power_up.y - power_up.height / 2,
+                power_up.width, power_up.height)
+        for enemy in game.enemies:
+            box(enemy.color, enemy.x - enemy.width / 2, enemy.y - enemy.height / 2, enemy.width, enemy.height)
+        store = game.enemy_bullets
+        n = len(store)
+        r = store.radius
+        for packed, x, y in zip(store.color[:n].tolist(), store.x[:n].tolist(), store.y[:n].tolist()):
+            box(packed, x - r, y - r, r * 2, r * 2)
+        for bullet in game.bullets:
+            if type(bullet) is Bullet:
+                box(bullet.color, bullet.x - bullet.radius, bullet.y - bullet.radius,
+                    bullet.radius * 2, bullet.radius * 2)
+            elif bullet.active:
+                box(bullet.color, bullet.x - bullet.width / 2, bullet.y, bullet.width, bullet.height)
+        player = game.player
+        box(player.color, player.x - player.width / 2, player.y - player.height / 2,
+            player.width, player.height)
+
+    def __call__(self, game):
+        # Render game and return the pixel view, shaped (height, width, 3)
+        # or (height, width) for grayscale. The same array is returned every
+        # time; copy it to keep a frame.
+        self.render(game)
+        return self.pixels
+
+
+class Env:
+    def __init__(self, seed=None, max_ticks=FPS * 600, frame_skip=1, tuning=None, observer=observe):
+        # Each step repeats the action for frame_skip ticks. observer turns
+        # the game into an observation, e.g. a PixelObserver.
+        self.next_seed = seed
+        self.max_ticks = max_ticks
+        self.frame_skip = frame_skip
+        self.tuning = tuning
+        self.observer = observer
+        self.game = None
+
+    def reset(self, seed=None):
+        # Start a new game. Without a seed, episodes use consecutive seeds
+        # from the one given to the constructor.
+        if seed is None:
+            seed = self.next_seed
+        self.game = Game(seed, self.tuning)
+        self.next_seed = self.game.seed + 1
+        return self.observer(self.game)
+
+    def advance(self, action):
+        # Run one step and return (reward, done)
+        game = self.game
+        score = game.score
+        for _ in range(self.frame_skip):
+            game.tick(action)
+            if game.game_over:
+                break
+        return game.score - score, game.game_over or game.ticks >= self.max_ticks
+
+    def step(self, action):
+        reward, done = self.advance(action)
+        return self.observer(self.game), reward, done, self.stats()
+
+    def stats(self):
+        game = self.game
+        return {"seed": game.seed, "score": game.score, "wave": game.wave, "ticks": game.ticks,
+                "game_over": game.game_over}
+
+
+class EnvGroup:
+    # A slice of a VectorEnv's games and the rows of the batch arrays they
+    # fill, stepped in-process or inside a worker
+    def __init__(self, first, seeds, stride, obs, rewards, dones, max_ticks, frame_skip, tuning):
+        self.first = first
+        self.seeds = seeds
+        self.stride = stride
+        self.envs = [Env(seed, max_ticks, frame_skip, tuning) for seed in seeds]
+        self.obs = obs
+        self.rewards = rewards
+        self.dones = dones
+
+    def reset(self):
+        for i, env in enumerate(self.envs):
+            env.reset(self.seeds[i])
+            self.seeds[i] += self.stride
+            observe(env.game, self.obs[i])
+
+    def step(self, actions):
+        # Returns {index in the VectorEnv: final stats} for finished games
+        infos = {}
+        obs = self.obs
+        rewards = self.rewards
+        dones = self.dones
+        for i, (env, action) in enumerate(zip(self.envs, actions.tolist())):
+            reward, done = env.advance(action)
+            rewards[i] = reward
+            dones[i] = done
+            if done:
+                infos[self.first + i] = env.stats()
+                env.reset(self.seeds[i])
+                self.seeds[i] += self.stride
+            observe(env.game, obs[i])
+        return infos
+
+
+def worker(conn, group_args, buffers):
+    obs, actions, rewards, dones = (np.frombuffer(buffer, dtype) for buffer, dtype in
+                                    zip(buffers, (np.float32, np.uint8, np.float32, np.bool_)))
+    first, count = group_args[0], len(group_args[1])
+    obs = obs.reshape(-1, OBS_SIZE)
+    rows = slice(first, first + count)
+    group = EnvGroup(*group_args[:3], obs[rows], rewards[rows], dones[rows], *group_args[3:])
+    while True:
+        command = conn.recv()
+        if command == "step":
+            conn.send(group.step(actions[rows]))
+        elif command == "reset":
+            group.reset()
+            conn.send(None)
+        else:
+            break
+
+
+class VectorEnv:
+    def __init__(self, num_envs, seed=None, workers=0, max_ticks=FPS * 600, frame_skip=1, tuning=None):
+        # Game i starts from seed + i and later episodes continue with
+        # seed + i + num_envs, seed + i + 2 * num_envs, ...
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+        self.num_envs = num_envs
+        seeds = [seed + i for i in range(num_envs)]
+        settings = (max_ticks, frame_skip, tuning)
+        self.conns = []
+        self.processes = []
+        if not workers:
+            self.obs = np.zeros((num_envs, OBS_SIZE), np.float32)
+            self.rewards = np.zeros(num_envs, np.float32)
+            self.dones = np.zeros(num_envs, np.bool_)
+            self.group = EnvGroup(0, seeds, num_envs, self.obs, self.rewards, self.dones, *settings)
+            return
+
+        # Batch arrays live in shared memory; each worker fills its own rows
+        buffers = (
+            multiprocessing.RawArray("f", num_envs * OBS_SIZE),
+            multiprocessing.RawArray("B", num_envs),
+            multiprocessing.RawArray("f", num_envs),
+            multiprocessing.RawArray("b", num_envs),
+        )
+        self.obs = np.frombuffer(buffers[0], np.float32).reshape(num_envs, OBS_SIZE)
+        self.actions = np.frombuffer(buffers[1], np.uint8)
+        self.rewards = np.frombuffer(buffers[2], np.float32)
+        self.dones = np.frombuffer(buffers[3], np.bool_)
+        workers = min(workers, num_envs)
+        bounds = np.linspace(0, num_envs, workers + 1).astype(int).tolist()
+        for first, stop in zip(bounds, bounds[1:]):
+            conn, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=worker, daemon=True,
+                                              args=(child, (first, seeds[first:stop], num_envs) + settings, buffers))
+            process.start()
+            self.conns.append(conn)
+            self.processes.append(process)
+
+    def reset(self):
+        # Returns the (num_envs, OBS_SIZE) observation batch. The arrays
+        # returned by reset() and step() are reused; copy them to keep them.
+        if not self.conns:
+            self.group.reset()
+            return self.obs
+        for conn in self.conns:
+            conn.send("reset")
+        for conn in self.conns:
+            conn.recv()
+        return self.obs
+
+    def step(self, actions):
+        # Returns (obs, rewards, dones, infos); finished games are reset
+        # straight away and infos maps their index to their final stats
+        if not self.conns:
+            infos = self.group.step(np.asarray(actions))
+            return self.obs, self.rewards, self.dones, infos
+        self.actions[:] = actions
+        for conn in self.conns:
+            conn.send("step")
+        infos = {}
+        for conn in self.conns:
+            infos.update(conn.recv())
+        return self.obs, self.rewards, self.dones, infos
+
+    def close(self):
+        for conn in self.conns:
+            conn.send("close")
+        for process in self.processes:
+            process.join()
+        self.conns = []
+        self.processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure VectorEnv throughput with random actions")
+    parser.add_argument("--envs", type=int, default=64, help="games stepped in lockstep (default 64)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes, 0 to step in-process (default: all cores)")
+    parser.add_argument("--steps", type=int, default=500, help="batched steps to time (default 500)")
+    parser.add_argument("--frame-skip", type=int, default=1, help="ticks per step (default 1)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    with VectorEnv(args.envs, args.seed, args.workers, frame_skip=args.frame_skip) as env:
+        env.reset()
+        episodes = 0
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            _, _, _, infos = env.step(rng.integers(0, N_ACTIONS, args.envs, dtype=np.uint8))
+            episodes += len(infos)
+        elapsed = time.perf_counter() - start
+    steps = args.steps * args.envs
+    print(f"{steps} env steps in {elapsed:.2f}s ({steps / elapsed:.0f} steps/s, "
+          f"{steps * args.frame_skip / elapsed:.0f} ticks/s), {episodes} episodes finished")
+
+
+if __name__ == "__main__":
+    main()
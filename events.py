@@ -0,0 +1,53 @@
+# Tick-scheduled game events.
+#
+# Rather than every entity counting its own timers down each tick, future
+# events (enemy shots, spawns, power-up expiry, burst follow-up shots) are
+# kept in one heap ordered by (tick, kind, sequence). Each phase of a tick
+# pops only what is due, so a tick where nothing happens costs a single
+# comparison however many entities are alive. Event kinds are small ints
+# chosen by the caller; within a tick, lower kinds run first and events of
+# the same kind run in the order they were scheduled.
+#
+# Entries are [tick, kind, seq, target] lists. cancel() blanks an entry in
+# place and it is discarded once it reaches the front of the heap.
+
+import heapq
+
+CANCELLED = object()
+
+
+class EventQueue:
+    def __init__(self):
+        self.heap = []
+        self.seq = 0
+        self.now = 0  # Tick being processed, set by the owner
+
+    def __len__(self):
+        return sum(1 for entry in self.heap if entry[3] is not CANCELLED)
+
+    def clear(self):
+        self.heap.clear()
+
+    def schedule(self, tick, kind, target=None):
+        # Returns the entry, which can be passed to cancel()
+        entry = [tick, kind, self.seq, target]
+        self.seq += 1
+        heapq.heappush(self.heap, entry)
+        return entry
+
+    def cancel(self, entry):
+        entry[3] = CANCELLED
+
+    def pop_due(self, tick, kind):
+        # Yields (kind, target) for every live event due at an earlier tick,
+        # or at this tick with a kind up to and including kind. Events
+        # scheduled while iterating are picked up if they are due too.
+        heap = self.heap
+        while heap and (heap[0][0] < tick or (heap[0][0] == tick and heap[0][1] <= kind)):
+            entry = heapq.heappop(heap)
+            if entry[3] is not CANCELLED:
+                yield entry[1], entry[3]
+
+    def pending(self):
+        # Live entries in the order they will run
+        return sorted(entry for entry in self.heap if entry[3] is not CANCELLED)
@@ -1,15 +1,33 @@
-import pygame
+import time
+
+# Reference point for the cold-start timings reported by main()
+IMPORT_START = time.perf_counter()
+
 import random
 import math
 import sys
+import zlib
+from array import array
+
+import profiler
+from events import EventQueue
+from lazy import lazy_import
+from particles import ParticleSystem
+from pools import Pool, sweep
+from projectiles import ProjectileStore
+from quality import FULL_QUALITY, LEVELS, QualityGovernor, find_level
+from registry import ENEMIES, POWER_UPS, SPAWNS, WEAPONS, compile_weapon
+import render
+from render_cache import pack_color, render_text
+from spatial import ColumnIndex, SpatialHash
 
-# Initialize pygame
-pygame.init()
+# pygame is imported on first use and only the parts that are needed get
+# initialized (see start_display), so the simulation runs without it
+pygame = lazy_import("pygame")
 
-# Screen dimensions
+# World dimensions. Game logic works in these units whatever the window and
+# render sizes (see main).
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Pixel Shooter Enhanced")
 
 # Colors
 BLACK = (0, 0, 0)
@@ -24,15 +42,72 @@ ORANGE = (255, 150, 0)
 PINK = (255, 100, 180)
 TEAL = (0, 180, 180)
 
-# Clock for controlling frame rate
-clock = pygame.time.Clock()
+# Simulation ticks per second the game is tuned for (movement is in pixels
+# per tick), also the default render rate
 FPS = 60
 
+# Difficulty tuning. Every Game copies these, so balance sweeps can override
+# them per game with Game(tuning={...}).
+TUNING = {
+    # Ticks between spawns: max(min, start - wave * step)
+    "spawn_interval_start": 120,
+    "spawn_interval_step": 8,
+    "spawn_interval_min": 40,
+    # Enemy mix by wave: (first wave, ((cumulative chance, type), ...)),
+    # from the spawn bands in content.json
+    "enemy_mix": SPAWNS,
+    "power_up_chance": 0.3,
+    # Per-weapon stat overrides merged into Player.weapons, e.g.
+    # {"Spread": {"damage": 8}}
+    "weapon_overrides": {},
+}
+
+# Below this many bullet x enemy pairs, check_collisions tests every pair
+# directly; building the grid costs more than it saves at that size
+BROADPHASE_MIN_PAIRS = 256
+
+# Most ticks run per drawn frame before the game slows down instead
+MAX_FRAME_SKIP = 5
+
+# Scheduled event kinds (see events.py), in the order their phases run
+# within a tick
+BURST_SHOT, POWER_UP_EXPIRY, ENEMY_SHOT, ENEMY_SPAWN = range(4)
+
+# Input bitmask used to drive the simulation, one value per tick
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_UP = 4
+INPUT_DOWN = 8
+INPUT_FIRE = 16
+
+def read_input(keys):
+    # Convert pygame's pressed-key state into an input bitmask
+    inputs = 0
+    if keys[pygame.K_LEFT]:
+        inputs |= INPUT_LEFT
+    if keys[pygame.K_RIGHT]:
+        inputs |= INPUT_RIGHT
+    if keys[pygame.K_UP]:
+        inputs |= INPUT_UP
+    if keys[pygame.K_DOWN]:
+        inputs |= INPUT_DOWN
+    if keys[pygame.K_SPACE]:
+        inputs |= INPUT_FIRE
+    return inputs
+
 # Player class
 class Player:
-    def __init__(self):
+    def __init__(self, fx_rng=None, events=None):
+        # fx_rng drives purely cosmetic randomness so that drawing never
+        # disturbs the simulation's random stream. Timers are deadlines on
+        # the events clock, with power-up expiry and burst shots scheduled
+        # there.
+        self.fx_rng = fx_rng or random.Random()
+        self.events = events if events is not None else EventQueue()
         self.x = WIDTH // 2
         self.y = HEIGHT - 100
+        self.prev_x = self.x  # Position before the last move, for drawing
+        self.prev_y = self.y
         self.width = 40
         self.height = 40
         self.speed = 5
@@ -40,126 +115,113 @@ class Player:
         self.health = 100
         self.max_health = 100
         self.weapon = "Pistol"
-        self.weapons = {
-            "Pistol": {"damage": 10, "fire_rate": 8, "color": WHITE, "bullet_speed": 10, "spread": 0},
-            "Shotgun": {"damage": 5, "fire_rate": 3, "color": YELLOW, "bullet_speed": 12, "spread": 15},
-            "Laser": {"damage": 25, "fire_rate": 1.5, "color": RED, "bullet_speed": 20, "spread": 0},
-            "Burst": {"damage": 8, "fire_rate": 4, "color": GREEN, "bullet_speed": 11, "spread": 5},
-            "Spread": {"damage": 6, "fire_rate": 2, "color": PINK, "bullet_speed": 9, "spread": 30},
-            "Railgun": {"damage": 40, "fire_rate": 1, "color": TEAL, "bullet_speed": 25, "spread": 0}
-        }
-        self.last_shot = 0
+        # Weapon stats are shared with the registry; replace an entry (see
+        # Game.apply_tuning) rather than modifying it
+        self.weapons = dict(WEAPONS)
+        self.last_shot = float("-inf")
         self.score = 0
-        self.invincible = 0
-        self.power_up_timer = 0
+        self.invincible_until = 0
+        self.power_up_until = 0
         self.power_up_type = None
         self.burst_count = 0
         self.burst_delay = 0
         self.burst_last_shot = 0
 
-    def draw(self, screen):
-        # Draw player ship
-        pygame.draw.polygon(screen, self.color, [
-            (self.x, self.y - self.height//2),
-            (self.x - self.width//2, self.y + self.height//2),
-            (self.x + self.width//2, self.y + self.height//2)
-        ])
-        
-        # Draw engine glow
-        glow_size = random.randint(5, 10)
-        pygame.draw.polygon(screen, YELLOW, [
-            (self.x - 10, self.y + self.height//2),
-            (self.x, self.y + self.height//2 + glow_size),
-            (self.x + 10, self.y + self.height//2)
-        ])
-        
-        # Draw health bar
-        bar_width = 50
-        bar_height = 6
-        pygame.draw.rect(screen, RED, (self.x - bar_width//2, self.y - 40, bar_width, bar_height))
-        pygame.draw.rect(screen, GREEN, (self.x - bar_width//2, self.y - 40, bar_width * (self.health / self.max_health), bar_height))
-        
-        # Draw weapon indicator
-        font = pygame.font.SysFont(None, 20)
-        weapon_text = font.render(f"Weapon: {self.weapon}", True, self.weapons[self.weapon]["color"])
-        screen.blit(weapon_text, (self.x - weapon_text.get_width()//2, self.y - 60))
-        
-        # Draw power-up timer if active
-        if self.power_up_timer > 0:
-            timer_text = font.render(f"{self.power_up_timer//60}s", True, YELLOW)
-            screen.blit(timer_text, (self.x - timer_text.get_width()//2, self.y - 80))
-        
-        # Draw invincibility effect
-        if self.invincible > 0:
-            pygame.draw.circle(screen, CYAN, (self.x, self.y), 30, 2)
+    @property
+    def invincible(self):
+        # Ticks of invincibility left
+        return max(0, self.invincible_until - self.events.now)
+
+    @invincible.setter
+    def invincible(self, ticks):
+        self.invincible_until = self.events.now + ticks
 
-    def move(self, keys):
-        if keys[pygame.K_LEFT] and self.x - self.width//2 > 0:
+    @property
+    def power_up_timer(self):
+        # Ticks left on the current weapon power-up
+        return max(0, self.power_up_until - self.events.now)
+
+    @power_up_timer.setter
+    def power_up_timer(self, ticks):
+        self.power_up_until = self.events.now + ticks
+        if ticks > 0:
+            self.events.schedule(self.power_up_until, POWER_UP_EXPIRY)
+
+    def render_row(self):
+        # Values of render.PLAYER_FIELDS. The engine glow flickers, a new
+        # size per captured frame.
+        return (self.x, self.y, self.prev_x, self.prev_y, self.width, self.height, self.color,
+                self.fx_rng.randint(5, 10), self.health, self.max_health, self.weapon,
+                self.weapons[self.weapon]["color"], self.power_up_timer, self.invincible)
+
+    def move(self, inputs):
+        self.prev_x = self.x
+        self.prev_y = self.y
+        if inputs & INPUT_LEFT and self.x - self.width//2 > 0:
             self.x -= self.speed
-        if keys[pygame.K_RIGHT] and self.x + self.width//2 < WIDTH:
+        if inputs & INPUT_RIGHT and self.x + self.width//2 < WIDTH:
             self.x += self.speed
-        if keys[pygame.K_UP] and self.y - self.height//2 > 0:
+        if inputs & INPUT_UP and self.y - self.height//2 > 0:
             self.y -= self.speed
-        if keys[pygame.K_DOWN] and self.y + self.height//2 < HEIGHT:
+        if inputs & INPUT_DOWN and self.y + self.height//2 < HEIGHT:
             self.y += self.speed
 
-    def shoot(self, bullets):
-        current_time = pygame.time.get_ticks()
+    def shoot(self, bullets, current_time):
+        # current_time is the simulation clock in milliseconds (Game.time_ms)
         weapon = self.weapons[self.weapon]
         
-        # Handle burst weapon
-        if self.weapon == "Burst" and self.burst_count > 0:
-            if current_time - self.burst_last_shot > self.burst_delay:
-                self.burst_last_shot = current_time
-                bullets.append(Bullet(self.x, self.y - 20, 0, -weapon["bullet_speed"], weapon["damage"], weapon["color"]))
-                self.burst_count -= 1
-                return True
+        # The rest of a burst fires on its own (see fire_burst)
+        if self.burst_count > 0 and weapon["pattern"] == "burst":
             return False
         
-        # Normal shooting
+        # Normal shooting, through the handler for the weapon's pattern
         if current_time - self.last_shot > 1000 / weapon["fire_rate"]:
             self.last_shot = current_time
-            
-            if self.weapon == "Pistol":
-                bullets.append(Bullet(self.x, self.y - 20, 0, -weapon["bullet_speed"], weapon["damage"], weapon["color"]))
-                
-            elif self.weapon == "Shotgun":
-                for angle in [-10, -5, 0, 5, 10]:
-                    rad_angle = math.radians(angle)
-                    bullets.append(Bullet(
-                        self.x, self.y - 20, 
-                        math.sin(rad_angle) * 3, 
-                        -math.cos(rad_angle) * weapon["bullet_speed"], 
-                        weapon["damage"], weapon["color"]
-                    ))
-                    
-            elif self.weapon == "Laser":
-                bullets.append(LaserBeam(self.x, self.y - 20, weapon["damage"], weapon["color"]))
-                
-            elif self.weapon == "Burst":
-                # Start burst sequence
-                self.burst_count = 3
-                self.burst_delay = 100  # ms between bursts
-                self.burst_last_shot = current_time
-                bullets.append(Bullet(self.x, self.y - 20, 0, -weapon["bullet_speed"], weapon["damage"], weapon["color"]))
-                self.burst_count -= 1
-                
-            elif self.weapon == "Spread":
-                for angle in range(-30, 31, 10):
-                    rad_angle = math.radians(angle)
-                    bullets.append(Bullet(
-                        self.x, self.y - 20, 
-                        math.sin(rad_angle) * 2, 
-                        -math.cos(rad_angle) * weapon["bullet_speed"], 
-                        weapon["damage"], weapon["color"]
-                    ))
-                    
-            elif self.weapon == "Railgun":
-                bullets.append(RailgunBeam(self.x, self.y - 20, weapon["damage"], weapon["color"]))
-                
+            FIRE_PATTERNS[weapon["pattern"]](self, bullets, weapon, current_time)
             return True
         return False
 
+    def fire_bullets(self, bullets, weapon, current_time):
+        # One bullet per entry of the weapon's precomputed velocity table
+        for dx, dy in weapon["velocities"]:
+            bullets.append(Bullet.spawn(self.x, self.y - 20, dx, dy, weapon["damage"], weapon["color"], self.weapon))
+
+    def start_burst(self, bullets, weapon, current_time):
+        self.burst_count = weapon["burst_count"]
+        self.burst_delay = weapon["burst_delay"]  # ms between shots
+        self.burst_last_shot = current_time
+        self.fire_bullets(bullets, weapon, current_time)
+        self.burst_count -= 1
+        if self.burst_count > 0:
+            self.schedule_burst()
+
+    def fire_laser(self, bullets, weapon, current_time):
+        bullets.append(LaserBeam.spawn(self.x, self.y - 20, weapon["damage"], weapon["color"], self.weapon))
+
+    def fire_railgun(self, bullets, weapon, current_time):
+        bullets.append(RailgunBeam.spawn(self.x, self.y - 20, weapon["damage"], weapon["color"], self.weapon))
+
+    def schedule_burst(self):
+        # Next burst shot on the first tick more than burst_delay ms after
+        # the last one
+        tick = self.events.now + 1
+        while tick * 1000 // FPS - self.burst_last_shot <= self.burst_delay:
+            tick += 1
+        self.events.schedule(tick, BURST_SHOT)
+
+    def fire_burst(self, bullets, current_time):
+        # Scheduled burst shot; the rest of the burst is dropped if the
+        # weapon changed in the meantime
+        weapon = self.weapons[self.weapon]
+        if weapon["pattern"] != "burst":
+            self.burst_count = 0
+            return
+        self.burst_last_shot = current_time
+        self.fire_bullets(bullets, weapon, current_time)
+        self.burst_count -= 1
+        if self.burst_count > 0:
+            self.schedule_burst()
+
     def take_damage(self, amount):
         if self.invincible <= 0:
             self.health -= amount
@@ -167,71 +229,76 @@ class Player:
             return True
         return False
 
-    def update(self):
-        if self.invincible > 0:
-            self.invincible -= 1
-            
-        if self.power_up_timer > 0:
-            self.power_up_timer -= 1
-            if self.power_up_timer == 0:
-                self.weapon = "Pistol"  # Revert to default weapon
+    def expire_power_up(self):
+        # Scheduled end of a power-up; a later pickup moves the deadline
+        if self.power_up_until == self.events.now:
+            self.weapon = "Pistol"  # Revert to default weapon
 
     def apply_power_up(self, power_type):
-        if power_type == "health":
-            self.health = min(self.health + 30, self.max_health)
-        elif power_type == "shotgun":
-            self.weapon = "Shotgun"
-            self.power_up_type = "shotgun"
-            self.power_up_timer = 300  # 5 seconds at 60 FPS
-        elif power_type == "laser":
-            self.weapon = "Laser"
-            self.power_up_type = "laser"
-            self.power_up_timer = 300
-        elif power_type == "burst":
-            self.weapon = "Burst"
-            self.power_up_type = "burst"
-            self.power_up_timer = 300
-        elif power_type == "spread":
-            self.weapon = "Spread"
-            self.power_up_type = "spread"
-            self.power_up_timer = 300
-        elif power_type == "railgun":
-            self.weapon = "Railgun"
-            self.power_up_type = "railgun"
-            self.power_up_timer = 300
+        power_up = POWER_UPS[power_type]
+        if "heal" in power_up:
+            self.health = min(self.health + power_up["heal"], self.max_health)
+        if "weapon" in power_up:
+            self.weapon = power_up["weapon"]
+            self.power_up_type = power_type
+            self.power_up_timer = power_up["duration"]
+
+# Firing handlers by weapon pattern
+FIRE_PATTERNS = {
+    "bullets": Player.fire_bullets,
+    "burst": Player.start_burst,
+    "laser": Player.fire_laser,
+    "railgun": Player.fire_railgun,
+}
+
+# Helpers for sweep(): entity removal checks and pool recycling
+def is_off_screen(entity):
+    return entity.is_off_screen()
+
+# Return a pooled entity (Bullet, LaserBeam or RailgunBeam) to its pool
+def recycle(entity):
+    entity.pool.release(entity)
 
 # Bullet class
+TRAIL_LENGTH = 5
+BULLET_RADIUS = 4
+
 class Bullet:
-    def __init__(self, x, y, dx, dy, damage, color):
+    __slots__ = ("x", "y", "dx", "dy", "damage", "color", "source", "radius", "trail_len")
+
+    def __init__(self, x, y, dx, dy, damage, color, source=None):
+        self.reset(x, y, dx, dy, damage, color, source)
+
+    def reset(self, x, y, dx, dy, damage, color, source=None):
+        # source is the name of the weapon that fired it, None for enemies
         self.x = x
         self.y = y
         self.dx = dx
         self.dy = dy
         self.damage = damage
         self.color = color
-        self.radius = 4
-        self.trail = []
+        self.source = source
+        self.radius = BULLET_RADIUS
+        self.trail_len = 0  # Ticks since firing, capped at TRAIL_LENGTH
+
+    @classmethod
+    def spawn(cls, *args):
+        return cls.pool.acquire(*args)
 
     def update(self):
-        self.trail.append((self.x, self.y))
-        if len(self.trail) > 5:
-            self.trail.pop(0)
+        # Bullets move in straight lines, so the trail is drawn back along
+        # the velocity and only its length needs keeping
+        if self.trail_len < TRAIL_LENGTH:
+            self.trail_len += 1
             
         self.x += self.dx
         self.y += self.dy
 
-    def draw(self, screen):
-        # Draw trail
-        for i, pos in enumerate(self.trail):
-            alpha = 100 - i * 20
-            if alpha > 0:
-                trail_surf = pygame.Surface((self.radius*2, self.radius*2), pygame.SRCALPHA)
-                pygame.draw.circle(trail_surf, (*self.color, alpha), (self.radius, self.radius), self.radius)
-                screen.blit(trail_surf, (pos[0] - self.radius, pos[1] - self.radius))
-        
-        # Draw bullet
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.radius)
-        pygame.draw.circle(screen, WHITE, (int(self.x), int(self.y)), self.radius - 1)
+    def render_row(self):
+        # A row of render.PROJECTILE_COLUMNS; the trail is drawn from the
+        # velocity
+        return (render.BULLET, self.x, self.y, self.dx, self.dy, self.radius, self.trail_len, 0, 0,
+                pack_color(self.color))
 
     def is_off_screen(self):
         return (self.x < 0 or self.x > WIDTH or 
@@ -239,136 +306,108 @@ class Bullet:
 
 # Laser beam class (special weapon)
 class LaserBeam:
-    def __init__(self, x, y, damage, color):
+    __slots__ = ("x", "y", "damage", "color", "source", "width", "height", "active", "timer",
+                 "damaged_enemies")
+
+    def __init__(self, x, y, damage, color, source=None):
+        self.reset(x, y, damage, color, source)
+
+    def reset(self, x, y, damage, color, source=None):
         self.x = x
         self.y = y
         self.damage = damage
         self.color = color
+        self.source = source
         self.width = 8
         self.height = HEIGHT - y
         self.active = True
         self.timer = 15  # Frames the laser stays active
-        self.damaged_enemies = []  # Track enemies already hit by this laser
+        self.damaged_enemies = set()  # Track enemies already hit by this laser
+
+    @classmethod
+    def spawn(cls, *args):
+        return cls.pool.acquire(*args)
 
     def update(self):
         self.timer -= 1
         if self.timer <= 0:
             self.active = False
 
-    def draw(self, screen):
+    def render_row(self):
         if self.active:
-            # Draw main beam
-            pygame.draw.rect(screen, self.color, (self.x - self.width//2, self.y, self.width, self.height))
-            
-            # Draw glow effect
-            for i in range(3):
-                glow_width = self.width + i * 6
-                alpha = 150 - i * 50
-                glow_surf = pygame.Surface((glow_width, self.height), pygame.SRCALPHA)
-                pygame.draw.rect(glow_surf, (*self.color, alpha), (0, 0, glow_width, self.height))
-                screen.blit(glow_surf, (self.x - glow_width//2, self.y))
+            return (render.LASER, self.x, self.y, 0, 0, 0, 0, self.width, self.height, pack_color(self.color))
 
     def is_off_screen(self):
         return not self.active
 
 # Railgun beam class
 class RailgunBeam:
-    def __init__(self, x, y, damage, color):
+    __slots__ = ("x", "y", "damage", "color", "source", "width", "height", "active", "timer",
+                 "damaged_enemies")
+
+    def __init__(self, x, y, damage, color, source=None):
+        self.reset(x, y, damage, color, source)
+
+    def reset(self, x, y, damage, color, source=None):
         self.x = x
         self.y = y
         self.damage = damage
         self.color = color
+        self.source = source
         self.width = 4
         self.height = HEIGHT - y
         self.active = True
         self.timer = 5  # Very short duration
-        self.damaged_enemies = []
+        self.damaged_enemies = set()
+
+    @classmethod
+    def spawn(cls, *args):
+        return cls.pool.acquire(*args)
 
     def update(self):
         self.timer -= 1
         if self.timer <= 0:
             self.active = False
 
-    def draw(self, screen):
+    def render_row(self):
         if self.active:
-            # Draw main beam with bright core
-            pygame.draw.rect(screen, WHITE, (self.x - self.width//2, self.y, self.width, self.height))
-            
-            # Draw outer glow
-            for i in range(1, 4):
-                glow_width = self.width + i * 4
-                alpha = 100 - i * 25
-                glow_surf = pygame.Surface((glow_width, self.height), pygame.SRCALPHA)
-                pygame.draw.rect(glow_surf, (*self.color, alpha), (0, 0, glow_width, self.height))
-                screen.blit(glow_surf, (self.x - glow_width//2, self.y))
+            return (render.RAILGUN, self.x, self.y, 0, 0, 0, 0, self.width, self.height, pack_color(self.color))
 
     def is_off_screen(self):
         return not self.active
 
 # Enemy class
 class Enemy:
+    __slots__ = ("x", "y", "type", "spec", "width", "height", "speed", "health", "color",
+                 "score_value", "max_health", "shot")
+
     def __init__(self, x, y, enemy_type="basic"):
+        # spec is the enemy type's entry in the registry
         self.x = x
         self.y = y
         self.type = enemy_type
-        
-        if enemy_type == "basic":
-            self.width = 30
-            self.height = 30
-            self.speed = 2
-            self.health = 20
-            self.color = RED
-            self.score_value = 10
-        elif enemy_type == "fast":
-            self.width = 20
-            self.height = 20
-            self.speed = 4
-            self.health = 10
-            self.color = ORANGE
-            self.score_value = 15
-        elif enemy_type == "tank":
-            self.width = 50
-            self.height = 50
-            self.speed = 1
-            self.health = 60
-            self.color = PURPLE
-            self.score_value = 30
-            
+        spec = self.spec = ENEMIES[enemy_type]
+        self.width = spec["width"]
+        self.height = spec["height"]
+        self.speed = spec["speed"]
+        self.health = spec["health"]
+        self.color = spec["color"]
+        self.score_value = spec["score_value"]
         self.max_health = self.health
-        self.shoot_timer = 0
-        self.bullets = []
+        self.shot = None  # Pending ENEMY_SHOT event, scheduled by Game.add_enemy
 
     def update(self):
         self.y += self.speed
-        
-        # Enemy shooting logic
-        self.shoot_timer += 1
-        if self.shoot_timer > 90 and random.random() < 0.02:  # Reduced enemy shooting frequency
-            self.shoot_timer = 0
-            self.bullets.append(Bullet(self.x, self.y + self.height//2, 0, 5, 5, RED))
-
-    def draw(self, screen):
-        # Draw enemy based on type
-        if self.type == "basic":
-            pygame.draw.rect(screen, self.color, (self.x - self.width//2, self.y - self.height//2, self.width, self.height))
-            # Draw details
-            pygame.draw.rect(screen, BLACK, (self.x - self.width//4, self.y - self.height//4, self.width//2, self.height//2))
-        elif self.type == "fast":
-            pygame.draw.polygon(screen, self.color, [
-                (self.x, self.y - self.height//2),
-                (self.x - self.width//2, self.y + self.height//2),
-                (self.x + self.width//2, self.y + self.height//2)
-            ])
-        elif self.type == "tank":
-            pygame.draw.circle(screen, self.color, (self.x, self.y), self.width//2)
-            pygame.draw.circle(screen, BLACK, (self.x, self.y), self.width//4)
-            
-        # Draw health bar
-        bar_width = self.width
-        bar_height = 4
-        pygame.draw.rect(screen, RED, (self.x - bar_width//2, self.y - self.height//2 - 10, bar_width, bar_height))
-        pygame.draw.rect(screen, GREEN, (self.x - bar_width//2, self.y - self.height//2 - 10, 
-                                         bar_width * (self.health / self.max_health), bar_height))
+
+    def shoot(self, bullets):
+        # bullets is the game's ProjectileStore of enemy bullets
+        shot = self.spec["shot"]
+        bullets.emit(self.x, self.y + self.height//2, 0, shot["speed"], shot["damage"], shot["color"])
+
+    def render_row(self):
+        # A row of render.ENEMY_COLUMNS
+        return (self.x, self.y, self.speed, self.width, self.height, self.health / self.max_health,
+                render.SHAPE_CODES[self.spec["shape"]], pack_color(self.color))
 
     def is_off_screen(self):
         return self.y > HEIGHT + self.height
@@ -378,276 +417,387 @@ class Enemy:
         return self.health <= 0
 
 # Power-up class
+POWER_UP_TYPES = list(POWER_UPS)
+
 class PowerUp:
-    def __init__(self, x, y):
+    __slots__ = ("x", "y", "width", "height", "speed", "type", "color")
+
+    def __init__(self, x, y, power_type):
         self.x = x
         self.y = y
-        self.width = 20
-        self.height = 20
-        self.speed = 2
-        self.type = random.choice(["health", "shotgun", "laser", "burst", "spread", "railgun"])
-        
-        color_map = {
-            "health": GREEN,
-            "shotgun": YELLOW,
-            "laser": RED,
-            "burst": GREEN,
-            "spread": PINK,
-            "railgun": TEAL
-        }
-        self.color = color_map[self.type]
+        spec = POWER_UPS[power_type]
+        self.width = spec["width"]
+        self.height = spec["height"]
+        self.speed = spec["speed"]
+        self.type = power_type
+        self.color = spec["color"]
 
     def update(self):
         self.y += self.speed
 
-    def draw(self, screen):
-        pygame.draw.rect(screen, self.color, (self.x - self.width//2, self.y - self.height//2, self.width, self.height))
-        
-        # Draw symbol based on type
-        if self.type == "health":
-            pygame.draw.rect(screen, WHITE, (self.x - 5, self.y - 8, 10, 16), 2)
-            pygame.draw.rect(screen, WHITE, (self.x - 8, self.y - 5, 16, 10), 2)
-        elif self.type == "shotgun":
-            pygame.draw.rect(screen, WHITE, (self.x - 6, self.y, 12, 4))
-            pygame.draw.circle(screen, WHITE, (self.x, self.y - 4), 3)
-        elif self.type == "laser":
-            pygame.draw.line(screen, WHITE, (self.x, self.y - 6), (self.x, self.y + 6), 3)
-        elif self.type == "burst":
-            for i in range(3):
-                pygame.draw.circle(screen, WHITE, (self.x - 4 + i*4, self.y), 2)
-        elif self.type == "spread":
-            pygame.draw.line(screen, WHITE, (self.x, self.y), (self.x - 5, self.y - 5), 2)
-            pygame.draw.line(screen, WHITE, (self.x, self.y), (self.x, self.y - 6), 2)
-            pygame.draw.line(screen, WHITE, (self.x, self.y), (self.x + 5, self.y - 5), 2)
-        elif self.type == "railgun":
-            pygame.draw.line(screen, WHITE, (self.x, self.y - 6), (self.x, self.y + 6), 2)
-            pygame.draw.rect(screen, WHITE, (self.x - 3, self.y - 3, 6, 6))
+    def render_row(self):
+        # A row of render.POWER_UP_COLUMNS
+        return (self.x, self.y, self.speed, self.width, self.height,
+                render.SYMBOL_CODES[POWER_UPS[self.type]["symbol"]], pack_color(self.color))
 
     def is_off_screen(self):
         return self.y > HEIGHT + self.height
 
-# Particle effect for explosions
-class Particle:
-    def __init__(self, x, y, color):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.size = random.randint(2, 6)
-        self.speed_x = random.uniform(-3, 3)
-        self.speed_y = random.uniform(-3, 3)
-        self.life = random.randint(20, 40)
-
-    def update(self):
-        self.x += self.speed_x
-        self.y += self.speed_y
-        self.life -= 1
-        self.size = max(0, self.size - 0.1)
-
-    def draw(self, screen):
-        alpha = min(255, self.life * 6)
-        particle_surf = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
-        pygame.draw.circle(particle_surf, (*self.color, alpha), (self.size, self.size), self.size)
-        screen.blit(particle_surf, (self.x - self.size, self.y - self.size))
-
-    def is_dead(self):
-        return self.life <= 0
+Bullet.pool = Pool(Bullet)
+LaserBeam.pool = Pool(LaserBeam, maxsize=64)
+RailgunBeam.pool = Pool(RailgunBeam, maxsize=64)
 
 # Game class to manage everything
 class Game:
-    def __init__(self):
-        self.player = Player()
+    def __init__(self, seed=None, tuning=None):
+        # All gameplay randomness comes from generators seeded here, so the
+        # same seed and inputs always produce the same game
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.events = EventQueue()
+        self.player = Player(random.Random(seed + 1), self.events)
+        
+        # Per-weapon statistics for balance runs
+        self.kills_by_weapon = {}
+        self.weapon_ticks = {}
         self.bullets = []
         self.enemies = []
+        self.enemy_bullets = ProjectileStore(WIDTH, HEIGHT, BULLET_RADIUS, TRAIL_LENGTH)
         self.power_ups = []
-        self.particles = []
-        self.enemy_spawn_timer = 0
+        self.particles = ParticleSystem(seed=seed)
+        self.set_quality(FULL_QUALITY)
+        self.last_spawn = -1  # Tick of the previous spawn
+        self.spawn_event = None
         self.score = 0
         self.game_over = False
         self.wave = 1
         self.enemies_killed = 0
-        self.background_stars = [(random.randint(0, WIDTH), random.randint(0, HEIGHT), random.randint(1, 3)) 
+        self.ticks = 0
+        
+        for name, value in TUNING.items():
+            setattr(self, name, value)
+        self.apply_tuning(tuning or {})
+        self.enemy_grid = SpatialHash()
+        self.enemy_columns = ColumnIndex()
+        self.background = None
+        self.render_state = None  # Reused by draw() and draw_dirty()
+        self.dirty_rects = None
+        self.profiler = profiler.NULL_PROFILER
+        self.background_stars = [(self.rng.randint(0, WIDTH), self.rng.randint(0, HEIGHT), self.rng.randint(1, 3)) 
                                 for _ in range(100)]
 
+    def apply_tuning(self, tuning):
+        # Override difficulty parameters named in TUNING
+        unknown = set(tuning) - set(TUNING)
+        if unknown:
+            raise ValueError(f"unknown tuning parameter(s): {', '.join(sorted(unknown))}")
+        for name, value in tuning.items():
+            setattr(self, name, value)
+        for name, stats in tuning.get("weapon_overrides", {}).items():
+            self.player.weapons[name] = compile_weapon(dict(self.player.weapons[name], **stats))
+        self.schedule_spawn(self.ticks)
+
+    def set_quality(self, quality):
+        # Visual level of detail, one of quality.LEVELS. Particles are purely
+        # cosmetic, so scaling them down leaves the simulation unchanged.
+        self.quality = quality
+        self.particles.scale = quality["particle_scale"]
+        self.particles.limit = quality["max_particles"]
+
+    @property
+    def time_ms(self):
+        # Simulation clock derived from the tick counter, so firing rates do
+        # not depend on how fast ticks are actually executed
+        return self.ticks * 1000 // FPS
+
+    def tick(self, inputs=0):
+        # Advance the simulation by one frame using an input bitmask
+        self.events.now = self.ticks
+        if not self.game_over:
+            self.player.move(inputs)
+            if inputs & INPUT_FIRE:
+                self.player.shoot(self.bullets, self.time_ms)
+            self.run_events(BURST_SHOT)
+            weapon = self.player.weapon
+            self.weapon_ticks[weapon] = self.weapon_ticks.get(weapon, 0) + 1
+            self.profiler.lap(profiler.INPUT)
+        self.update()
+        self.ticks += 1
+
+    def step(self, n_ticks=1, inputs=0):
+        # Headless stepping: no window, no drawing and no frame-rate cap.
+        # inputs is either one bitmask held for every tick or a sequence
+        # with one bitmask per tick.
+        if isinstance(inputs, int):
+            for _ in range(n_ticks):
+                self.tick(inputs)
+        else:
+            for _, tick_inputs in zip(range(n_ticks), inputs):
+                self.tick(tick_inputs)
+
+    def checksum(self):
+        # CRC32 of the simulation state, used to detect replay divergence.
+        # Particles depend on the quality level and are left out.
+        player = self.player
+        values = [self.ticks, self.score, self.wave, self.enemies_killed, self.last_spawn,
+                  player.x, player.y, player.health, player.invincible, player.power_up_timer,
+                  player.last_shot, player.burst_count, player.burst_last_shot]
+        for bullet in self.bullets:
+            values += (bullet.x, bullet.y, bullet.damage)
+        for enemy in self.enemies:
+            values += (enemy.x, enemy.y, enemy.health, enemy.shot[0])
+        n = len(self.enemy_bullets)
+        values += self.enemy_bullets.x[:n].tolist()
+        values += self.enemy_bullets.y[:n].tolist()
+        for power_up in self.power_ups:
+            values += (power_up.x, power_up.y)
+        crc = zlib.crc32(array("d", values).tobytes())
+        return zlib.crc32(player.weapon.encode(), crc)
+
+    def run_events(self, kind):
+        # Handle the scheduled events due up to this tick's phase for kind
+        player = self.player
+        for event, target in self.events.pop_due(self.ticks, kind):
+            if event == BURST_SHOT:
+                player.fire_burst(self.bullets, self.time_ms)
+            elif event == POWER_UP_EXPIRY:
+                player.expire_power_up()
+            elif event == ENEMY_SHOT:
+                target.shoot(self.enemy_bullets)
+                self.schedule_shot(target)
+            elif event == ENEMY_SPAWN:
+                self.spawn_enemy()
+
+    def schedule_spawn(self, earliest):
+        # (Re)schedule the next spawn, spawn_rate ticks after the previous
+        # one at the current wave's rate but no sooner than tick earliest
+        if self.spawn_event is not None:
+            self.events.cancel(self.spawn_event)
+        spawn_rate = max(self.spawn_interval_min,
+                         self.spawn_interval_start - self.wave * self.spawn_interval_step)
+        tick = max(self.last_spawn + spawn_rate + 1, earliest)
+        self.spawn_event = self.events.schedule(tick, ENEMY_SPAWN)
+
+    def schedule_shot(self, enemy):
+        # Ticks until the shot are the enemy's cooldown plus a geometric
+        # number of per-tick chance rolls, drawn with a single random number
+        shot = enemy.spec["shot"]
+        rolls = 1 + int(math.log(1.0 - self.rng.random()) / shot["log_miss"])
+        enemy.shot = self.events.schedule(self.ticks + shot["cooldown"] + rolls, ENEMY_SHOT, enemy)
+
+    def add_enemy(self, enemy):
+        self.enemies.append(enemy)
+        self.schedule_shot(enemy)
+
+    def remove_enemy(self, enemy):
+        # Cancel the pending shot of an enemy leaving the game
+        if enemy.shot is not None:
+            self.events.cancel(enemy.shot)
+
     def spawn_enemy(self):
-        self.enemy_spawn_timer += 1
-        spawn_rate = max(40, 120 - self.wave * 8)  # Reduced spawn rate
+        self.last_spawn = self.ticks
+        self.schedule_spawn(self.ticks + 1)
         
-        if self.enemy_spawn_timer > spawn_rate:
-            self.enemy_spawn_timer = 0
-            
-            # Determine enemy type based on wave
-            rand = random.random()
-            if self.wave < 3:
-                enemy_type = "basic"
-            elif self.wave < 5:
-                enemy_type = "basic" if rand < 0.8 else "fast"  # Fewer enemies
-            else:
-                if rand < 0.6:
-                    enemy_type = "basic"
-                elif rand < 0.85:
-                    enemy_type = "fast"
-                else:
-                    enemy_type = "tank"
-                    
-            x = random.randint(50, WIDTH - 50)
-            self.enemies.append(Enemy(x, -50, enemy_type))
+        # Determine enemy type based on wave
+        rand = self.rng.random()
+        mix = self.enemy_mix[0][1]
+        for first_wave, band in self.enemy_mix:
+            if self.wave >= first_wave:
+                mix = band
+        enemy_type = mix[-1][1]
+        for chance, candidate in mix:
+            if rand < chance:
+                enemy_type = candidate
+                break
+                
+        x = self.rng.randint(50, WIDTH - 50)
+        self.add_enemy(Enemy(x, -50, enemy_type))
 
     def spawn_power_up(self, x, y):
-        if random.random() < 0.3:  # Increased chance to spawn power-up
-            self.power_ups.append(PowerUp(x, y))
+        if self.rng.random() < self.power_up_chance:
+            self.power_ups.append(PowerUp(x, y, self.rng.choice(POWER_UP_TYPES)))
+
+    def destroy_enemy(self, enemy, source):
+        self.kills_by_weapon[source] = self.kills_by_weapon.get(source, 0) + 1
+        self.score += enemy.score_value
+        self.enemies_killed += 1
+        self.spawn_power_up(enemy.x, enemy.y)
+        
+        # Create explosion particles
+        self.particles.emit(enemy.x, enemy.y, enemy.color, 20)
+
+    def build_broadphase(self, boxes):
+        # Rebuild the enemy grid from this tick's (x, y, half_w, half_h)
+        # enemy boxes. Grid items are list indices so candidates come back in
+        # list order.
+        self.enemy_grid.clear()
+        insert = self.enemy_grid.insert
+        for i, (x, y, half_w, half_h) in enumerate(boxes):
+            insert(i, x - half_w, y - half_h, x + half_w, y + half_h)
+
 
     def check_collisions(self):
+        prof = self.profiler
+        enemies = self.enemies
+        # Centre and half size of each enemy, for the exact tests
+        boxes = [(enemy.x, enemy.y, enemy.width//2, enemy.height//2) for enemy in enemies]
+        if len(self.bullets) * len(enemies) >= BROADPHASE_MIN_PAIRS:
+            self.build_broadphase(boxes)
+            nearby = self.enemy_grid.query
+        else:
+            # Every enemy is a candidate, in list order as the grid returns them
+            everyone = range(len(enemies))
+            nearby = lambda left, top, right, bottom: everyone
+        dead = set()  # Indices of enemies removed this tick
+        player = self.player
+        player_box = (player.x - player.width//2, player.y - player.height//2,
+                      player.x + player.width//2, player.y + player.height//2)
+        
         # Player bullets vs enemies
-        for bullet in self.bullets[:]:
+        spent = set()
+        for bullet in self.bullets:
             # Skip special weapons that handle their own collisions
             if isinstance(bullet, (LaserBeam, RailgunBeam)):
                 continue
                 
-            for enemy in self.enemies[:]:
-                if (abs(bullet.x - enemy.x) < (bullet.radius + enemy.width//2) and
-                    abs(bullet.y - enemy.y) < (bullet.radius + enemy.height//2)):
-                    
+            r = bullet.radius
+            x = bullet.x
+            y = bullet.y
+            for i in nearby(x - r, y - r, x + r, y + r):
+                if i in dead:
+                    continue
+                ex, ey, half_w, half_h = boxes[i]
+                if abs(x - ex) < r + half_w and abs(y - ey) < r + half_h:
+                    enemy = enemies[i]
                     if enemy.take_damage(bullet.damage):
                         # Enemy destroyed
-                        self.score += enemy.score_value
-                        self.enemies_killed += 1
-                        self.spawn_power_up(enemy.x, enemy.y)
-                        
-                        # Create explosion particles
-                        for _ in range(20):
-                            self.particles.append(Particle(enemy.x, enemy.y, enemy.color))
-                        
-                        self.enemies.remove(enemy)
+                        self.destroy_enemy(enemy, bullet.source)
+                        dead.add(i)
                     
-                    if bullet in self.bullets:
-                        self.bullets.remove(bullet)
+                    spent.add(bullet)
                     break
+                    
+        if spent:
+            sweep(self.bullets, spent.__contains__, recycle)
+        prof.lap(profiler.HIT_BULLETS)
 
-        # Laser vs enemies
-        for bullet in self.bullets[:]:
-            if isinstance(bullet, LaserBeam) and bullet.active:
-                for enemy in self.enemies[:]:
-                    if (abs(bullet.x - enemy.x) < (bullet.width//2 + enemy.width//2) and
-                        enemy.y > bullet.y and enemy not in bullet.damaged_enemies):
-                        
-                        bullet.damaged_enemies.append(enemy)
-                        if enemy.take_damage(bullet.damage):
-                            # Enemy destroyed
-                            self.score += enemy.score_value
-                            self.enemies_killed += 1
-                            self.spawn_power_up(enemy.x, enemy.y)
-                            
-                            # Create explosion particles
-                            for _ in range(20):
-                                self.particles.append(Particle(enemy.x, enemy.y, enemy.color))
-                            
-                            self.enemies.remove(enemy)
-
-        # Railgun vs enemies
-        for bullet in self.bullets[:]:
-            if isinstance(bullet, RailgunBeam) and bullet.active:
-                for enemy in self.enemies[:]:
-                    if (abs(bullet.x - enemy.x) < (bullet.width//2 + enemy.width//2) and
-                        enemy.y > bullet.y and enemy not in bullet.damaged_enemies):
+        # Beams vs enemies: all lasers first, then all railguns
+        beams = [bullet for bullet in self.bullets if type(bullet) is LaserBeam and bullet.active]
+        beams += [bullet for bullet in self.bullets if type(bullet) is RailgunBeam and bullet.active]
+        if beams and enemies:
+            self.enemy_columns.rebuild((enemy.x, enemy.width//2, i) for i, enemy in enumerate(enemies))
+            for beam in beams:
+                half_width = beam.width//2
+                damaged = beam.damaged_enemies
+                for i in self.enemy_columns.query(beam.x, half_width):
+                    if i in dead:
+                        continue
+                    enemy = enemies[i]
+                    if (abs(beam.x - enemy.x) < (half_width + enemy.width//2) and
+                        enemy.y > beam.y and enemy not in damaged):
                         
-                        bullet.damaged_enemies.append(enemy)
-                        if enemy.take_damage(bullet.damage):
+                        damaged.add(enemy)
+                        if enemy.take_damage(beam.damage):
                             # Enemy destroyed
-                            self.score += enemy.score_value
-                            self.enemies_killed += 1
-                            self.spawn_power_up(enemy.x, enemy.y)
-                            
-                            # Create explosion particles
-                            for _ in range(20):
-                                self.particles.append(Particle(enemy.x, enemy.y, enemy.color))
-                            
-                            self.enemies.remove(enemy)
-
-        # Enemy bullets vs player
-        for enemy in self.enemies:
-            for bullet in enemy.bullets[:]:
-                if (abs(bullet.x - self.player.x) < (bullet.radius + self.player.width//2) and
-                    abs(bullet.y - self.player.y) < (bullet.radius + self.player.height//2)):
-                    
-                    if self.player.take_damage(bullet.damage):
-                        # Create hit particles
-                        for _ in range(10):
-                            self.particles.append(Particle(self.player.x, self.player.y, RED))
-                    
-                    if bullet in enemy.bullets:
-                        enemy.bullets.remove(bullet)
-                    break
+                            self.destroy_enemy(enemy, beam.source)
+                            dead.add(i)
+        prof.lap(profiler.HIT_BEAMS)
+
+        # Enemy bullets vs player. Every bullet touching the player is used
+        # up; invincibility frames mean only the first one does damage.
+        enemy_bullets = self.enemy_bullets
+        hits = enemy_bullets.hits(player.x, player.y, player.width//2, player.height//2)
+        if hits:
+            for i in hits:
+                if player.take_damage(int(enemy_bullets.damage[i])):
+                    # Create hit particles
+                    self.particles.emit(player.x, player.y, RED, 10)
+            enemy_bullets.remove(hits)
+        prof.lap(profiler.HIT_ENEMY_BULLETS)
 
         # Enemies vs player (collision damage)
-        for enemy in self.enemies[:]:
-            if (abs(enemy.x - self.player.x) < (enemy.width//2 + self.player.width//2) and
-                abs(enemy.y - self.player.y) < (enemy.height//2 + self.player.height//2)):
+        for i in nearby(*player_box):
+            if i in dead:
+                continue
+            enemy = enemies[i]
+            if (abs(enemy.x - player.x) < (enemy.width//2 + player.width//2) and
+                abs(enemy.y - player.y) < (enemy.height//2 + player.height//2)):
                 
-                if self.player.take_damage(10):
+                if player.take_damage(10):
                     # Create hit particles
-                    for _ in range(15):
-                        self.particles.append(Particle(self.player.x, self.player.y, RED))
+                    self.particles.emit(player.x, player.y, RED, 15)
                 
                 # Create explosion and remove enemy
-                for _ in range(20):
-                    self.particles.append(Particle(enemy.x, enemy.y, enemy.color))
+                self.particles.emit(enemy.x, enemy.y, enemy.color, 20)
                 
-                self.enemies.remove(enemy)
+                dead.add(i)
+                self.kills_by_weapon["Ram"] = self.kills_by_weapon.get("Ram", 0) + 1
                 self.score += enemy.score_value
                 self.enemies_killed += 1
+                
+        if dead:
+            for i in dead:
+                self.remove_enemy(enemies[i])
+            self.enemies[:] = [enemy for i, enemy in enumerate(enemies) if i not in dead]
+        prof.lap(profiler.HIT_RAM)
 
-        # Power-ups vs player
-        for power_up in self.power_ups[:]:
-            if (abs(power_up.x - self.player.x) < (power_up.width//2 + self.player.width//2) and
-                abs(power_up.y - self.player.y) < (power_up.height//2 + self.player.height//2)):
+        # Power-ups vs player, after the kills so that power-ups dropped this
+        # tick can be collected straight away. There is a single query box,
+        # so a direct scan beats building a grid for it.
+        collected = set()
+        for i, power_up in enumerate(self.power_ups):
+            if (abs(power_up.x - player.x) < (power_up.width//2 + player.width//2) and
+                abs(power_up.y - player.y) < (power_up.height//2 + player.height//2)):
                 
-                self.player.apply_power_up(power_up.type)
+                player.apply_power_up(power_up.type)
                 
                 # Create collection particles
-                for _ in range(15):
-                    self.particles.append(Particle(power_up.x, power_up.y, power_up.color))
+                self.particles.emit(power_up.x, power_up.y, power_up.color, 15)
                 
-                self.power_ups.remove(power_up)
+                collected.add(i)
+        if collected:
+            self.power_ups[:] = [p for i, p in enumerate(self.power_ups) if i not in collected]
+        prof.lap(profiler.HIT_POWER_UPS)
 
     def update(self):
         if self.game_over:
             return
             
-        # Update player
-        self.player.update()
+        prof = self.profiler
+        
+        # Player timers that ran out
+        self.run_events(POWER_UP_EXPIRY)
+        prof.lap(profiler.PLAYER)
         
         # Update bullets
-        for bullet in self.bullets[:]:
+        for bullet in self.bullets:
             bullet.update()
-            if bullet.is_off_screen():
-                self.bullets.remove(bullet)
+        sweep(self.bullets, is_off_screen, recycle)
+        prof.lap(profiler.PROJECTILES)
                 
-        # Update enemies and their bullets
-        for enemy in self.enemies[:]:
+        # Update enemies, fire the shots that are due and move enemy bullets
+        for enemy in self.enemies:
             enemy.update()
-            
-            for bullet in enemy.bullets[:]:
-                bullet.update()
-                if bullet.is_off_screen():
-                    enemy.bullets.remove(bullet)
-                    
-            if enemy.is_off_screen():
-                self.enemies.remove(enemy)
+        self.run_events(ENEMY_SHOT)
+        self.enemy_bullets.update()
+        sweep(self.enemies, is_off_screen, self.remove_enemy)
+        prof.lap(profiler.ENEMIES)
                 
         # Update power-ups
-        for power_up in self.power_ups[:]:
+        for power_up in self.power_ups:
             power_up.update()
-            if power_up.is_off_screen():
-                self.power_ups.remove(power_up)
+        sweep(self.power_ups, is_off_screen)
+        prof.lap(profiler.POWER_UPS)
                 
         # Update particles
-        for particle in self.particles[:]:
-            particle.update()
-            if particle.is_dead():
-                self.particles.remove(particle)
+        self.particles.update()
+        prof.lap(profiler.PARTICLES)
                 
         # Spawn enemies
-        self.spawn_enemy()
+        self.run_events(ENEMY_SPAWN)
+        prof.lap(profiler.SPAWN)
         
         # Check collisions
         self.check_collisions()
@@ -660,101 +810,346 @@ class Game:
         if self.enemies_killed >= self.wave * 8:  # Reduced enemies per wave
             self.wave += 1
             self.enemies_killed = 0
+            self.schedule_spawn(self.ticks + 1)
 
-    def draw(self, screen):
-        # Draw background
-        screen.fill(BLACK)
-        
-        # Draw stars
-        for x, y, size in self.background_stars:
-            pygame.draw.circle(screen, WHITE, (x, y), size)
-        
-        # Draw player
-        self.player.draw(screen)
-        
-        # Draw bullets
-        for bullet in self.bullets:
-            bullet.draw(screen)
-            
-        # Draw enemies and their bullets
-        for enemy in self.enemies:
-            enemy.draw(screen)
-            for bullet in enemy.bullets:
-                bullet.draw(screen)
-                
-        # Draw power-ups
-        for power_up in self.power_ups:
-            power_up.draw(screen)
-            
-        # Draw particles
-        for particle in self.particles:
-            particle.draw(screen)
-            
-        # Draw HUD
-        font = pygame.font.SysFont(None, 36)
-        score_text = font.render(f"Score: {self.score}", True, WHITE)
-        screen.blit(score_text, (10, 10))
-        
-        wave_text = font.render(f"Wave: {self.wave}", True, WHITE)
-        screen.blit(wave_text, (WIDTH - wave_text.get_width() - 10, 10))
-        
-        # Draw game over screen
-        if self.game_over:
-            overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 180))
-            screen.blit(overlay, (0, 0))
-            
-            game_over_font = pygame.font.SysFont(None, 72)
-            game_over_text = game_over_font.render("GAME OVER", True, RED)
-            screen.blit(game_over_text, (WIDTH//2 - game_over_text.get_width()//2, HEIGHT//2 - 50))
-            
-            score_font = pygame.font.SysFont(None, 48)
-            final_score_text = score_font.render(f"Final Score: {self.score}", True, WHITE)
-            screen.blit(final_score_text, (WIDTH//2 - final_score_text.get_width()//2, HEIGHT//2 + 20))
-            
-            restart_font = pygame.font.SysFont(None, 36)
-            restart_text = restart_font.render("Press R to Restart", True, GREEN)
-            screen.blit(restart_text, (WIDTH//2 - restart_text.get_width()//2, HEIGHT//2 + 80))
+    def get_background(self):
+        # The starfield never changes, so it is rendered once per game
+        if self.background is None:
+            background = pygame.Surface((WIDTH, HEIGHT))
+            if pygame.display.get_surface() is not None:
+                background = background.convert()
+            background.fill(BLACK)
+            for x, y, size in self.background_stars:
+                pygame.draw.circle(background, WHITE, (x, y), size)
+            self.background = background
+        return self.background
+
+    def capture(self, state, lag=0.0):
+        # Copy what the next frame shows into a render.RenderState. Moving
+        # things are drawn lag ticks (0-1) back towards where they were at
+        # the previous tick, interpolating between ticks.
+        quality = self.quality
+        state.background = self.get_background()
+        state.lag = 0.0 if self.game_over else lag
+        state.trail_length = quality["trail_length"]
+        state.glow_layers = quality["glow_layers"]
+        state.player = self.player.render_row()
+        state.score = self.score
+        state.wave = self.wave
+        state.game_over = self.game_over
+        state.projectiles.fill([row for row in (bullet.render_row() for bullet in self.bullets) if row])
+        state.enemies.fill([enemy.render_row() for enemy in self.enemies])
+        state.power_ups.fill([power_up.render_row() for power_up in self.power_ups])
+        state.capture_stores(self.enemy_bullets, self.particles)
+        return state
+
+    def draw(self, screen, lag=0.0):
+        # Full redraw on this thread; the caller flips the whole display. A
+        # surface of another size than the world gets the world scaled to
+        # its width.
+        if self.render_state is None:
+            self.render_state = render.RenderState()
+        self.capture(self.render_state, lag)
+        self.profiler.lap(profiler.CAPTURE)
+        render.draw(screen, self.render_state, self.profiler)
+
+    def draw_dirty(self, screen, lag=0.0):
+        # Dirty-rectangle redraw on this thread, returning the changed rects
+        # for pygame.display.update() (see render.draw_dirty)
+        if self.render_state is None:
+            self.render_state = render.RenderState()
+        self.capture(self.render_state, lag)
+        self.profiler.lap(profiler.CAPTURE)
+        changed, self.dirty_rects = render.draw_dirty(screen, self.render_state, self.dirty_rects, self.profiler)
+        return changed
 
 # Main game loop
-def main():
-    game = Game()
+def start_display(size=(WIDTH, HEIGHT), flags=0):
+    # Open the game window. Fonts initialize on first use (render_cache) and
+    # the mixer is never started because the game has no sound.
+    pygame.display.init()
+    pygame.display.set_caption("Pixel Shooter Enhanced")
+    return pygame.display.set_mode(size, flags)
+
+def main(dirty_rects=False, seed=None, record=None, checksum_every=60, profile_out=None,
+         quality="auto", frame_budget=None, render_cap=FPS, max_frame_skip=MAX_FRAME_SKIP,
+         render_thread=True, window_size=None, render_scale=1.0, scaled=False, capture_dir=None,
+         capture_every=1, capture_format="png"):
+    # The simulation advances in fixed ticks of 1/FPS seconds of real time
+    # (speeds and timers are counted in ticks, so the rate is fixed),
+    # independently of how often frames are drawn (at most render_cap per
+    # second, 0 for no cap). Each frame runs the ticks that have come due
+    # and draws the state interpolated between the last two ticks. When
+    # drawing falls behind, up to max_frame_skip ticks run per frame before
+    # the simulation is allowed to slow down. With render_thread, frames are
+    # drawn on a background thread (see render.RenderWorker) while the next
+    # ticks run, and shown one frame later.
+    #
+    # The game world is WIDTH x HEIGHT. Frames are rendered at render_scale
+    # times that size and, when the window (window_size, by default the
+    # world size) differs, scaled to it with one blit per frame. With
+    # scaled, the window is opened with pygame.SCALED at the render size
+    # instead, and SDL stretches it to the window on the GPU.
+    frame_size = (round(WIDTH * render_scale), round(HEIGHT * render_scale))
+    if scaled:
+        screen = start_display(frame_size, pygame.SCALED)
+    else:
+        screen = start_display(window_size or (WIDTH, HEIGHT))
+    frame = screen
+    if screen.get_size() != frame_size:
+        frame = pygame.Surface(frame_size).convert()
+    clock = pygame.time.Clock()
+    game = Game(seed)
     running = True
+    tick_seconds = 1 / FPS
+    max_frame_skip = max(1, max_frame_skip)
+    
+    # Effects quality is either fixed or adjusted by a governor that keeps
+    # the work per frame within frame_budget milliseconds
+    frame_budget = frame_budget or 1000 / (render_cap or FPS)
+    governor = None
+    if quality == "auto":
+        governor = QualityGovernor(frame_budget)
+        level = governor.quality
+    else:
+        level = find_level(quality)
+    game.set_quality(level)
+    worker = render.RenderWorker(screen, dirty_rects, frame) if render_thread else None
+    
+    # Optional recording of every capture_every-th frame shown, written out
+    # on a background thread. Frames are dropped rather than delaying the
+    # loop or taking a frame over budget.
+    recorder = None
+    if capture_dir:
+        from capture import FrameRecorder
+        recorder = FrameRecorder(capture_dir, capture_every, capture_format, budget_ms=frame_budget)
+    
+    # Frame timing is always collected; F3 toggles the overlay and F4 writes
+    # the buffered frames to profile_out (frame-profile.csv by default)
+    frame_profiler = profiler.FrameProfiler()
+    game.profiler = frame_profiler
     
+    # Optional input recording; each session (restart) gets its own log
+    log = None
+    session = 1
+    if record:
+        from replay import InputLog
+        log = InputLog(game.seed, checksum_every=checksum_every)
+    
+    fire_pressed = False
+    accumulator = 0.0
+    last_time = time.perf_counter()
     while running:
+        frame_profiler.begin_frame()
+        
         # Handle events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE and not game.game_over:
-                    game.player.shoot(game.bullets)
+                    fire_pressed = True
                 elif event.key == pygame.K_r and game.game_over:
                     game = Game()  # Restart game
+                    game.profiler = frame_profiler
+                    game.set_quality(level)
+                    if log is not None:
+                        log.save(session_log_path(record, session))
+                        session += 1
+                        log = InputLog(game.seed, checksum_every=checksum_every)
+                elif event.key == pygame.K_F3:
+                    frame_profiler.toggle_overlay()
+                elif event.key == pygame.K_F4:
+                    frame_profiler.export(profile_out or "frame-profile.csv")
                     
-        # Get pressed keys for continuous movement
-        keys = pygame.key.get_pressed()
-        if not game.game_over:
-            game.player.move(keys)
-            
-            # Auto-fire when holding space
-            if keys[pygame.K_SPACE]:
-                game.player.shoot(game.bullets)
+        # Get pressed keys for continuous movement and auto-fire
+        held = read_input(pygame.key.get_pressed())
+        frame_profiler.lap(profiler.INPUT)
         
-        # Update game state
-        game.update()
+        # Run the ticks that came due since the last frame. Time beyond
+        # max_frame_skip ticks is dropped rather than caught up later.
+        now = time.perf_counter()
+        accumulator += now - last_time
+        last_time = now
+        ticks = 0
+        while accumulator >= tick_seconds and ticks < max_frame_skip:
+            # A fire tap counts once, on the first tick after it
+            inputs = held | INPUT_FIRE if fire_pressed else held
+            fire_pressed = False
+            game.tick(inputs)
+            if log is not None:
+                log.record(inputs, game)
+            accumulator -= tick_seconds
+            ticks += 1
+        if accumulator >= tick_seconds:
+            accumulator %= tick_seconds
         
-        # Draw everything
-        game.draw(screen)
-        
-        # Update display
-        pygame.display.flip()
+        # Draw everything, interpolated between the previous and the current
+        # tick, and update the display: either only the changed regions or
+        # the whole screen
+        lag = 1 - accumulator / tick_seconds
+        if worker is not None:
+            # The frame captured last time was drawn while the ticks above
+            # ran; present it, then capture this one for the worker
+            rects = worker.wait()
+            frame_profiler.lap(profiler.RENDER_WAIT)
+            frame_profiler.add(worker.timer.take())
+            drawn = worker.drawn
+        else:
+            if dirty_rects:
+                rects = game.draw_dirty(frame, lag)
+            else:
+                game.draw(frame, lag)
+                rects = None
+            if frame is not screen:
+                render.present(frame, screen)
+                rects = None
+                frame_profiler.lap(profiler.SCALE)
+            drawn = game.dirty_rects
+        overlay = frame_profiler.draw_overlay(screen, render_text)
+        frame_profiler.lap(profiler.DRAW_HUD)
+        if rects is not None:
+            if overlay:
+                # Restored along with the entities next frame
+                rects.append(overlay)
+                drawn.append(overlay)
+            pygame.display.update(rects)
+        else:
+            pygame.display.flip()
+        frame_profiler.lap(profiler.FLIP)
+        if recorder is not None:
+            recorder.capture(screen, (time.perf_counter() - frame_profiler.frame_start) * 1000)
+            frame_profiler.lap(profiler.RECORD)
+        if worker is not None:
+            worker.submit(game.capture(worker.free_state(), lag))
+            frame_profiler.lap(profiler.CAPTURE)
+        frame_profiler.end_frame(game)
+        if governor is not None:
+            if governor.observe((time.perf_counter() - frame_profiler.frame_start) * 1000):
+                level = governor.quality
+                game.set_quality(level)
+        if not frame_profiler.startup:
+            frame_profiler.startup = {
+                "import_ms": IMPORT_MS,
+                "first_frame_ms": (time.perf_counter() - IMPORT_START) * 1000,
+            }
         
-        # Control frame rate
-        clock.tick(FPS)
+        # Cap the render rate
+        clock.tick(render_cap)
     
+    if worker is not None:
+        worker.close()
+    if recorder is not None:
+        recorder.close()
+        print(recorder.summary())
+    if log is not None:
+        log.save(session_log_path(record, session))
+    if profile_out:
+        frame_profiler.export(profile_out)
     pygame.quit()
     sys.exit()
 
+# Time taken to import this module and everything it depends on
+IMPORT_MS = (time.perf_counter() - IMPORT_START) * 1000
+
+# session.psr, session-2.psr, session-3.psr, ...
+def session_log_path(path, session):
+    if session == 1:
+        return path
+    stem, dot, ext = path.rpartition(".")
+    return f"{stem}-{session}.{ext}" if dot else f"{path}-{session}"
+
+# "1920x1080" -> (1920, 1080), for --window
+def parse_size(text):
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+# Run the simulation without a window as fast as possible, restarting
+# whenever the player dies, and report throughput. With profile, per-phase
+# tick timings are printed (and exported to profile_out if given). With
+# capture_dir, every capture_every-th tick is also drawn to an offscreen
+# surface at render_scale times the world size and recorded, waiting for
+# the writer rather than dropping frames.
+def run_headless(n_ticks, inputs=INPUT_FIRE, seed=None, profile=False, profile_out=None, capture_dir=None,
+                 capture_every=1, capture_format="png", render_scale=1.0):
+    game = Game(seed)
+    tick_profiler = profiler.FrameProfiler(capacity=10000) if profile or profile_out else profiler.NULL_PROFILER
+    game.profiler = tick_profiler
+    recorder = None
+    if capture_dir:
+        from capture import FrameRecorder
+        recorder = FrameRecorder(capture_dir, capture_every, capture_format, drop=False)
+        surface = pygame.Surface((round(WIDTH * render_scale), round(HEIGHT * render_scale)))
+    start = time.perf_counter()
+    for _ in range(n_ticks):
+        if game.game_over:
+            game = Game(game.seed + 1)
+            game.profiler = tick_profiler
+        tick_profiler.begin_frame()
+        game.tick(inputs)
+        if recorder is not None:
+            if recorder.due():
+                game.draw(surface)
+            recorder.capture(surface)
+            tick_profiler.lap(profiler.RECORD)
+        tick_profiler.end_frame(game)
+    elapsed = time.perf_counter() - start
+    print(f"{n_ticks} ticks in {elapsed:.2f}s ({n_ticks / elapsed:.0f} ticks/s)")
+    if recorder is not None:
+        recorder.close()
+        print(recorder.summary())
+    if tick_profiler is not profiler.NULL_PROFILER:
+        print("\n".join(tick_profiler.summary_lines()))
+        if profile_out:
+            tick_profiler.export(profile_out)
+
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Pixel Shooter Enhanced")
+    parser.add_argument("--headless", type=int, metavar="TICKS",
+                        help="run TICKS simulation ticks without a display and exit")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="redraw and update only the changed screen regions")
+    parser.add_argument("--seed", type=int, help="random seed for the first game")
+    parser.add_argument("--record", metavar="PATH",
+                        help="record per-tick inputs to PATH for 'python replay.py PATH'")
+    parser.add_argument("--checksum-every", type=int, default=60, metavar="N",
+                        help="store a state checksum every N recorded ticks (0 disables)")
+    parser.add_argument("--profile", action="store_true",
+                        help="with --headless, print per-phase tick timings")
+    parser.add_argument("--profile-out", metavar="PATH",
+                        help="write per-phase frame timings to PATH (.csv or .json) on exit")
+    parser.add_argument("--quality", default="auto", choices=["auto"] + [level["name"] for level in LEVELS],
+                        help="effects quality; auto lowers it while frames run over budget (default: auto)")
+    parser.add_argument("--frame-budget", type=float, metavar="MS",
+                        help="work time per frame the auto quality aims for (default: one frame at the render cap)")
+    parser.add_argument("--render-cap", type=float, default=FPS, metavar="FPS",
+                        help=f"maximum frames drawn per second, 0 for no cap (default: {FPS})")
+    parser.add_argument("--max-frame-skip", type=int, default=MAX_FRAME_SKIP, metavar="N",
+                        help=f"most ticks run per drawn frame before the game slows down (default: {MAX_FRAME_SKIP})")
+    parser.add_argument("--no-render-thread", dest="render_thread", action="store_false",
+                        help="draw frames on the main thread instead of overlapping them with the simulation")
+    parser.add_argument("--window", type=parse_size, metavar="WxH",
+                        help=f"window size; frames are scaled to fit (default: the world size, {WIDTH}x{HEIGHT})")
+    parser.add_argument("--render-scale", type=float, default=1.0, metavar="F",
+                        help="render frames at F times the world size, e.g. 0.5 for half resolution (default: 1)")
+    parser.add_argument("--scaled", action="store_true",
+                        help="let SDL scale the rendered frames to the window on the GPU (pygame.SCALED)")
+    parser.add_argument("--capture", metavar="DIR",
+                        help="record frames to DIR on a background thread (with --headless, from an offscreen render)")
+    parser.add_argument("--capture-every", type=int, default=1, metavar="N",
+                        help="record every Nth frame (default: 1)")
+    parser.add_argument("--capture-format", default="png", choices=["png", "raw"],
+                        help="numbered PNG files or one raw BGRX stream, frames.raw (default: png)")
+    args = parser.parse_args()
+    if args.headless is not None:
+        run_headless(args.headless, seed=args.seed, profile=args.profile, profile_out=args.profile_out,
+                     capture_dir=args.capture, capture_every=args.capture_every,
+                     capture_format=args.capture_format, render_scale=args.render_scale)
+    else:
+        main(dirty_rects=args.dirty_rects, seed=args.seed, record=args.record,
+             checksum_every=args.checksum_every, profile_out=args.profile_out,
+             quality=args.quality, frame_budget=args.frame_budget, render_cap=args.render_cap, max_frame_skip=args.max_frame_skip,
+             render_thread=args.render_thread, window_size=args.window, render_scale=args.render_scale,
+             scaled=args.scaled, capture_dir=args.capture, capture_every=args.capture_every,
+             capture_format=args.capture_format)
@@ -0,0 +1,23 @@
+# Deferred imports for heavy optional modules.
+#
+# lazy_import(name) returns the module object straight away but only runs
+# the real import on first attribute access. game.py and its helpers import
+# pygame and numpy this way, so code that only runs the simulation (headless
+# tools, batch workers, training environments) starts in milliseconds and
+# pays for pygame only when something is drawn.
+
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,157 @@
+# Particle effects stored as a struct of NumPy arrays.
+#
+# Live particles occupy the first `count` slots of each array. Spawning,
+# updating and removing dead particles are vectorized, and drawing blits
+# cached alpha circles in a single Surface.blits() call. Compaction keeps
+# particles in emission order, so the oldest are always at the front.
+#
+# scale and limit are set from the quality level (see quality.py): emit()
+# multiplies the requested amount by scale, and when limit is set the oldest
+# particles are evicted to stay within it.
+
+from lazy import lazy_import
+from render_cache import SurfaceCache, pack_color, unpack_color
+
+np = lazy_import("numpy")
+pygame = lazy_import("pygame")
+
+
+class ParticleSystem:
+    def __init__(self, capacity=1024, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.count = 0
+        self.scale = 1.0
+        self.limit = None
+        self.sprites = SurfaceCache(maxsize=4096)
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = self.count
+        arrays = {
+            "x": np.zeros(capacity),
+            "y": np.zeros(capacity),
+            "speed_x": np.zeros(capacity),
+            "speed_y": np.zeros(capacity),
+            "size": np.zeros(capacity),
+            "life": np.zeros(capacity, np.int32),
+            "color": np.zeros(capacity, np.uint32),  # Packed 0xRRGGBB
+        }
+        for name, array in arrays.items():
+            if old:
+                array[:old] = getattr(self, name)[:old]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def emit(self, x, y, color, amount):
+        # Same ranges as the old per-object Particle: size 2-6, speed +-3 and
+        # 20-40 ticks of life
+        if self.scale != 1.0:
+            amount = round(amount * self.scale)
+        if self.limit is not None:
+            amount = min(amount, self.limit)
+            excess = self.count + amount - self.limit
+            if excess > 0:
+                self.evict(excess)
+        if amount <= 0:
+            return
+        start = self.count
+        end = start + amount
+        if end > self.capacity:
+            self._allocate(max(end, self.capacity * 2))
+        rng = self.rng
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.speed_x[start:end] = rng.uniform(-3, 3, amount)
+        self.speed_y[start:end] = rng.uniform(-3, 3, amount)
+        self.size[start:end] = rng.integers(2, 7, amount)
+        self.life[start:end] = rng.integers(20, 41, amount)
+        self.color[start:end] = pack_color(color)
+        self.count = end
+
+    def copy_from(self, other):
+        # Make this system a copy of other's live particles, reusing its
+        # arrays (for render snapshots)
+        n = other.count
+        if n > self.capacity:
+            self.count = 0
+            self._allocate(max(n, self.capacity * 2))
+        for name in ("x", "y", "speed_x", "speed_y", "size", "life", "color"):
+            getattr(self, name)[:n] = getattr(other, name)[:n]
+        self.count = n
+
+    def evict(self, n):
+        # Drop the n oldest particles
+        keep = self.count - n
+        for array in (self.x, self.y, self.speed_x, self.speed_y, self.size, self.life, self.color):
+            array[:keep] = array[n:self.count]
+        self.count = keep
+
+    def update(self):
+        n = self.count
+        if n == 0:
+            return
+        self.x[:n] += self.speed_x[:n]
+        self.y[:n] += self.speed_y[:n]
+        self.life[:n] -= 1
+        size = self.size[:n]
+        np.maximum(size - 0.1, 0, out=size)
+
+        # Compact the survivors to the front of the arrays
+        alive = self.life[:n] > 0
+        survivors = int(np.count_nonzero(alive))
+        if survivors < n:
+            for array in (self.x, self.y, self.speed_x, self.speed_y, self.size, self.life, self.color):
+                array[:survivors] = array[:n][alive]
+            self.count = survivors
+
+    def sprite(self, key):
+        # key packs 0xRRGGBB, radius and alpha into one int
+        surf = self.sprites.lookup(key)
+        if surf is None:
+            color, radius, alpha = key >> 16, (key >> 8) & 0xFF, key & 0xFF
+            rgba = (*unpack_color(color), alpha)
+            surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(surf, rgba, (radius, radius), radius)
+            surf = self.sprites.add(key, surf)
+        return surf
+
+    def draw(self, screen, rects=None, lag=0.0, scale=1.0):
+        # Particles are drawn lag ticks back along their velocity, with
+        # positions and sizes multiplied by scale. When rects is a list, the
+        # blitted areas are appended to it
+        n = self.count
+        if n == 0:
+            return
+        size = self.size[:n]
+        if scale != 1:
+            size = size * scale
+        radius = size.astype(np.int64)
+        alpha = np.minimum(self.life[:n] * 6, 255)
+        visible = radius > 0
+        if not visible.all():
+            radius = radius[visible]
+            alpha = alpha[visible]
+        keys = (self.color[:n][visible].astype(np.int64) << 16) | (radius << 8) | alpha
+        x = self.x[:n]
+        y = self.y[:n]
+        if lag:
+            x = x - self.speed_x[:n] * lag
+            y = y - self.speed_y[:n] * lag
+        if scale != 1:
+            x = x * scale
+            y = y * scale
+        left = (x[visible] - radius).tolist()
+        top = (y[visible] - radius).tolist()
+        # Resolve each distinct sprite once per frame rather than per particle
+        unique_keys, slots = np.unique(keys, return_inverse=True)
+        surfs = [self.sprite(key) for key in unique_keys.tolist()]
+        blit_rects = screen.blits([(surfs[slot], (px, py)) for slot, px, py in zip(slots.tolist(), left, top)],
+                                  doreturn=rects is not None)
+        if rects is not None:
+            rects.extend(blit_rects)
@@ -0,0 +1,38 @@
+# Free-list object pools and in-place list compaction for short-lived
+# entities such as bullets and beams.
+#
+# A pooled class implements reset(*args) with the same arguments as its
+# constructor; acquire() reuses a released instance when one is available.
+
+
+class Pool:
+    def __init__(self, factory, maxsize=4096):
+        self.factory = factory
+        self.maxsize = maxsize
+        self.free = []
+
+    def acquire(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+            return obj
+        return self.factory(*args)
+
+    def release(self, obj):
+        if len(self.free) < self.maxsize:
+            self.free.append(obj)
+
+
+def sweep(items, is_dead, release=None):
+    # Mark-and-sweep compaction: drops every item for which is_dead(item) is
+    # true in a single pass, keeping the survivors in order, and hands the
+    # dropped items to release() (usually a Pool.release).
+    keep = 0
+    for item in items:
+        if is_dead(item):
+            if release is not None:
+                release(item)
+        else:
+            items[keep] = item
+            keep += 1
+    del items[keep:]
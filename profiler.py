@@ -0,0 +1,207 @@
+# Per-phase frame timing.
+#
+# Game.update, Game.check_collisions, render.draw_scene and main() call
+# profiler.lap(PHASE) after each phase; the elapsed time since the previous
+# lap is charged to that phase. Work done on the render thread is timed with
+# a LapTimer and added to the frame that presents it. end_frame() stores the frame's timings and
+# entity counts in a fixed-size ring buffer, from which the overlay shows
+# p50/p95/p99 and export() writes CSV or JSON for offline analysis. A lap is
+# one perf_counter() call and a list update, so profiling can stay enabled.
+
+import csv
+import json
+import time
+
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+
+PHASES = (
+    "input",
+    "player",
+    "projectiles",
+    "enemies",
+    "power_ups",
+    "particles",
+    "spawn",
+    "hit_bullets",
+    "hit_beams",
+    "hit_enemy_bullets",
+    "hit_ram",
+    "hit_power_ups",
+    "draw_background",
+    "draw_player",
+    "draw_bullets",
+    "draw_enemies",
+    "draw_power_ups",
+    "draw_particles",
+    "draw_hud",
+    "capture",
+    "render_wait",
+    "scale",
+    "flip",
+    "record",
+)
+(INPUT, PLAYER, PROJECTILES, ENEMIES, POWER_UPS, PARTICLES, SPAWN,
+ HIT_BULLETS, HIT_BEAMS, HIT_ENEMY_BULLETS, HIT_RAM, HIT_POWER_UPS,
+ DRAW_BACKGROUND, DRAW_PLAYER, DRAW_BULLETS, DRAW_ENEMIES, DRAW_POWER_UPS,
+ DRAW_PARTICLES, DRAW_HUD, CAPTURE, RENDER_WAIT, SCALE, FLIP, RECORD) = range(len(PHASES))
+
+COUNTS = ("bullets", "enemies", "enemy_bullets", "power_ups", "particles")
+
+
+class NullProfiler:
+    # Stand-in used when profiling is off
+    def begin_frame(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def end_frame(self, game=None):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class LapTimer:
+    # Phase times for work done on another thread
+    def __init__(self):
+        self.current = [0.0] * len(PHASES)
+        self.last = time.perf_counter()
+
+    def begin(self):
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def take(self):
+        # Seconds per phase since the last take()
+        times = self.current
+        self.current = [0.0] * len(PHASES)
+        return times
+
+
+class FrameProfiler:
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.times = np.zeros((capacity, len(PHASES)))  # Milliseconds per phase
+        self.frame_times = np.zeros(capacity)  # Wall time between frame starts
+        self.counts = np.zeros((capacity, len(COUNTS)), np.int32)
+        self.frames = 0
+        self.current = [0.0] * len(PHASES)
+        self.frame_start = None
+        self.last = time.perf_counter()
+        self.overlay_visible = False
+        self.overlay_lines = []
+        self.startup = {}  # Cold-start timings in milliseconds, set by main()
+
+    def __len__(self):
+        return min(self.frames, self.capacity)
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        if self.frame_start is not None and self.frames:
+            self.frame_times[(self.frames - 1) % self.capacity] = (now - self.frame_start) * 1000
+        self.frame_start = now
+        self.last = now
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def add(self, times):
+        # Charge seconds per phase (from LapTimer.take()) to this frame
+        for phase, seconds in enumerate(times):
+            self.current[phase] += seconds
+
+    def end_frame(self, game=None):
+        row = self.frames % self.capacity
+        now = time.perf_counter()
+        # Replaced by the full frame time (including any sleep) at the next
+        # begin_frame()
+        self.frame_times[row] = (now - (self.frame_start or now)) * 1000
+        self.times[row] = self.current
+        self.times[row] *= 1000
+        self.current = [0.0] * len(PHASES)
+        if game is not None:
+            self.counts[row] = (
+                len(game.bullets),
+                len(game.enemies),
+                len(game.enemy_bullets),
+                len(game.power_ups),
+                len(game.particles),
+            )
+        self.frames += 1
+        if self.overlay_visible and self.frames % 30 == 0:
+            self.overlay_lines = self.summary_lines()
+
+    def history(self):
+        # Buffered frames in chronological order: (times, frame_times, counts)
+        n = len(self)
+        order = np.arange(self.frames - n, self.frames) % self.capacity
+        return self.times[order], self.frame_times[order], self.counts[order]
+
+    def percentiles(self, q=(50, 95, 99)):
+        # {phase: [p50, p95, p99]} in milliseconds, plus "total" for the
+        # summed work per frame
+        times, _, _ = self.history()
+        if len(times) == 0:
+            return {}
+        result = dict(zip(PHASES, np.percentile(times, q, axis=0).T.tolist()))
+        result["total"] = np.percentile(times.sum(axis=1), q).tolist()
+        return result
+
+    def summary_lines(self):
+        lines = [f"{'phase':<18}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for phase, (p50, p95, p99) in self.percentiles().items():
+            lines.append(f"{phase:<18}{p50:7.2f}{p95:7.2f}{p99:7.2f}")
+        if self.frames:
+            counts = self.counts[(self.frames - 1) % self.capacity]
+            lines.append("  ".join(f"{name} {count}" for name, count in zip(COUNTS, counts.tolist())))
+        if self.startup:
+            lines.append("  ".join(f"{name} {ms:.0f}" for name, ms in self.startup.items()))
+        return lines
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+        self.overlay_lines = self.summary_lines() if self.overlay_visible else []
+
+    def draw_overlay(self, screen, render_text, color=(255, 255, 255)):
+        # Returns the rect covered by the overlay, or None when hidden
+        if not self.overlay_visible:
+            return None
+        dirty = None
+        for i, line in enumerate(self.overlay_lines):
+            rect = screen.blit(render_text(18, line, color), (10, 50 + i * 14))
+            dirty = rect if dirty is None else dirty.union(rect)
+        return dirty
+
+    def export(self, path):
+        # Writes the buffered frames as CSV, or JSON if path ends in .json
+        times, frame_times, counts = self.history()
+        if path.endswith(".json"):
+            data = {
+                "phases": PHASES,
+                "counts": COUNTS,
+                "percentiles": self.percentiles(),
+                "startup": self.startup,
+                "frames": [
+                    {"frame_ms": frame, "phases_ms": row, "counts": count}
+                    for frame, row, count in zip(frame_times.tolist(), times.tolist(), counts.tolist())
+                ],
+            }
+            with open(path, "w") as f:
+                json.dump(data, f)
+            return
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("frame", "frame_ms") + PHASES + COUNTS)
+            first = self.frames - len(times)
+            for i, (frame, row, count) in enumerate(zip(frame_times.tolist(), times.tolist(), counts.tolist())):
+                writer.writerow([first + i, round(frame, 4)] + [round(t, 4) for t in row] + count)
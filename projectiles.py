@@ -0,0 +1,192 @@
+# Hostile projectiles stored as a struct of NumPy arrays.
+#
+# Every enemy bullet in the game lives in one store, independent of the
+# enemy that fired it, so bullets keep flying after their shooter dies.
+# Live bullets occupy the first `count` slots in firing order. Movement,
+# off-screen culling and the player hit test are single vectorized passes
+# (short Python loops for the handful of bullets of normal play), and the
+# whole store is drawn with one Surface.blits() call. Bullets move
+# in straight lines, so their trails are derived from velocity and age
+# instead of being recorded.
+
+from lazy import lazy_import
+from render_cache import circle_sprite, pack_color, unpack_color
+
+np = lazy_import("numpy")
+
+WHITE = (255, 255, 255)
+
+# Below this many live bullets, update() and hits() loop in Python: a normal
+# game has only a few enemy bullets, and the fixed cost of each NumPy call
+# outweighs the per-bullet work
+SMALL_COUNT = 16
+
+
+class ProjectileStore:
+    def __init__(self, width, height, radius=4, trail_length=5, capacity=256):
+        # Bullets leaving the width x height area are removed
+        self.width = width
+        self.height = height
+        self.radius = radius
+        self.trail_length = trail_length
+        self.count = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = self.count
+        arrays = {
+            "x": np.zeros(capacity),
+            "y": np.zeros(capacity),
+            "dx": np.zeros(capacity),
+            "dy": np.zeros(capacity),
+            "damage": np.zeros(capacity, np.int32),
+            "age": np.zeros(capacity, np.int32),  # Ticks since firing
+            "color": np.zeros(capacity, np.uint32),  # Packed 0xRRGGBB
+        }
+        for name, array in arrays.items():
+            if old:
+                array[:old] = getattr(self, name)[:old]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def emit(self, x, y, dx, dy, damage, color):
+        i = self.count
+        if i == self.capacity:
+            self._allocate(self.capacity * 2)
+        self.x[i] = x
+        self.y[i] = y
+        self.dx[i] = dx
+        self.dy[i] = dy
+        self.damage[i] = damage
+        self.age[i] = 0
+        self.color[i] = pack_color(color)
+        self.count = i + 1
+
+    def copy_from(self, other):
+        # Make this store a copy of other's live bullets, reusing its arrays
+        # (for render snapshots)
+        self.width = other.width
+        self.height = other.height
+        self.radius = other.radius
+        self.trail_length = other.trail_length
+        n = other.count
+        if n > self.capacity:
+            self.count = 0
+            self._allocate(max(n, self.capacity * 2))
+        for name in ("x", "y", "dx", "dy", "damage", "age", "color"):
+            getattr(self, name)[:n] = getattr(other, name)[:n]
+        self.count = n
+
+    def keep(self, alive):
+        # Compact the bullets where alive is true to the front, in order
+        survivors = int(np.count_nonzero(alive))
+        if survivors < self.count:
+            n = self.count
+            for array in (self.x, self.y, self.dx, self.dy, self.damage, self.age, self.color):
+                array[:survivors] = array[:n][alive]
+            self.count = survivors
+
+    def update(self):
+        n = self.count
+        if n == 0:
+            return
+        if n < SMALL_COUNT:
+            # The same float64 arithmetic on Python floats
+            width, height = self.width, self.height
+            x = [a + b for a, b in zip(self.x[:n].tolist(), self.dx[:n].tolist())]
+            y = [a + b for a, b in zip(self.y[:n].tolist(), self.dy[:n].tolist())]
+            self.x[:n] = x
+            self.y[:n] = y
+            self.age[:n] += 1
+            for bx, by in zip(x, y):
+                if not (0 <= bx <= width and 0 <= by <= height):
+                    x = self.x[:n]
+                    y = self.y[:n]
+                    self.keep((x >= 0) & (x <= width) & (y >= 0) & (y <= height))
+                    break
+            return
+        x = self.x[:n]
+        y = self.y[:n]
+        x += self.dx[:n]
+        y += self.dy[:n]
+        self.age[:n] += 1
+        self.keep((x >= 0) & (x <= self.width) & (y >= 0) & (y <= self.height))
+
+    def hits(self, cx, cy, half_width, half_height):
+        # Indices, in firing order, of bullets overlapping the box centred
+        # on (cx, cy)
+        n = self.count
+        if n == 0:
+            return []
+        r = self.radius
+        if n < SMALL_COUNT:
+            reach_x = r + half_width
+            reach_y = r + half_height
+            return [i for i, (x, y) in enumerate(zip(self.x[:n].tolist(), self.y[:n].tolist()))
+                    if abs(x - cx) < reach_x and abs(y - cy) < reach_y]
+        overlap = ((np.abs(self.x[:n] - cx) < r + half_width) &
+                   (np.abs(self.y[:n] - cy) < r + half_height))
+        return np.flatnonzero(overlap).tolist()
+
+    def remove(self, indices):
+        alive = np.ones(self.count, np.bool_)
+        alive[indices] = False
+        self.keep(alive)
+
+    def draw(self, screen, rects=None, trail_length=None, lag=0.0, scale=1.0):
+        # Trails first (oldest positions first, fading as player bullet
+        # trails do), then bullet bodies, all drawn lag ticks back along the
+        # velocity, with positions and sizes multiplied by scale.
+        # trail_length limits the trails to the newest positions. When rects
+        # is a list, the blitted areas are appended to it.
+        n = self.count
+        if n == 0:
+            return
+        r = self.radius
+        x = self.x[:n]
+        y = self.y[:n]
+        dx = self.dx[:n]
+        dy = self.dy[:n]
+        if lag:
+            x = x - dx * lag
+            y = y - dy * lag
+        if scale != 1:
+            r = max(2, round(r * scale))  # Room for the core
+            x = x * scale
+            y = y * scale
+            dx = dx * scale
+            dy = dy * scale
+        trail_len = np.minimum(self.age[:n], self.trail_length)
+        sprites = {}
+        blits = []
+        if trail_length is None or trail_length > self.trail_length:
+            trail_length = self.trail_length
+        for k in range(trail_length, 0, -1):
+            # k ticks back along the velocity; present if the bullet is that old
+            idx = np.flatnonzero(trail_len >= k)
+            if len(idx) == 0:
+                continue
+            left = (x[idx] - k * dx[idx] - r).tolist()
+            top = (y[idx] - k * dy[idx] - r).tolist()
+            alphas = (100 - (trail_len[idx] - k) * 20).tolist()
+            for packed, alpha, px, py in zip(self.color[idx].tolist(), alphas, left, top):
+                surf = sprites.get((packed, alpha))
+                if surf is None:
+                    surf = sprites[packed, alpha] = circle_sprite(r, unpack_color(packed), alpha)
+                blits.append((surf, (px, py)))
+        core = circle_sprite(r - 1, WHITE)
+        for packed, px, py in zip(self.color[:n].tolist(), x.astype(np.int64).tolist(), y.astype(np.int64).tolist()):
+            body = sprites.get(packed)
+            if body is None:
+                body = sprites[packed] = circle_sprite(r, unpack_color(packed))
+            blits.append((body, (px - r, py - r)))
+            blits.append((core, (px - r + 1, py - r + 1)))
+        blit_rects = screen.blits(blits, doreturn=rects is not None)
+        if rects is not None:
+            rects.extend(blit_rects)
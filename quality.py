@@ -0,0 +1,79 @@
+# Adaptive level of detail for visual effects.
+#
+# LEVELS lists the quality settings from best to cheapest. Each one sets how
+# many particles an explosion emits (as a fraction of the full amount), the
+# cap on live particles (the oldest are evicted first), how many trail
+# positions bullets draw and how many glow layers beams draw. Only cosmetic
+# work is scaled, so the simulation and its checksums are the same at every
+# level. Edit LEVELS to tune them.
+#
+# QualityGovernor watches the work time of recent frames. When too many of
+# them go over the budget it drops one level, and after a sustained run of
+# frames with clear headroom it climbs back up one level:
+#
+#   governor = QualityGovernor(budget_ms=1000 / FPS)
+#   ...
+#   if governor.observe(frame_ms):
+#       game.set_quality(governor.quality)
+
+from collections import deque
+
+LEVELS = (
+    {"name": "high", "particle_scale": 1.0, "max_particles": None, "trail_length": 5, "glow_layers": 3},
+    {"name": "medium", "particle_scale": 0.5, "max_particles": 600, "trail_length": 3, "glow_layers": 2},
+    {"name": "low", "particle_scale": 0.25, "max_particles": 250, "trail_length": 1, "glow_layers": 1},
+    {"name": "minimal", "particle_scale": 0.1, "max_particles": 100, "trail_length": 0, "glow_layers": 0},
+)
+
+FULL_QUALITY = LEVELS[0]
+
+
+def find_level(name, levels=LEVELS):
+    for level in levels:
+        if level["name"] == name:
+            return level
+    raise ValueError(f"unknown quality level {name!r}")
+
+
+class QualityGovernor:
+    def __init__(self, budget_ms, levels=LEVELS, window=30, tolerance=3, recover_frames=180, headroom=0.7):
+        # Drops a level when more than tolerance of the last window frames
+        # took longer than budget_ms, and raises it again after
+        # recover_frames consecutive frames under headroom * budget_ms
+        self.budget_ms = budget_ms
+        self.levels = levels
+        self.tolerance = tolerance
+        self.recover_frames = recover_frames
+        self.headroom = headroom
+        self.level = 0
+        self.recent = deque(maxlen=window)
+        self.calm = 0
+        self.changes = 0
+
+    @property
+    def quality(self):
+        return self.levels[self.level]
+
+    def observe(self, frame_ms):
+        # Record one frame's work time (excluding any frame-rate sleep).
+        # Returns True when the quality level changed.
+        self.recent.append(frame_ms > self.budget_ms)
+        if frame_ms < self.budget_ms * self.headroom:
+            self.calm += 1
+        else:
+            self.calm = 0
+
+        if sum(self.recent) > self.tolerance and self.level < len(self.levels) - 1:
+            self.set_level(self.level + 1)
+            return True
+        if self.calm >= self.recover_frames and self.level > 0:
+            self.set_level(self.level - 1)
+            return True
+        return False
+
+    def set_level(self, level):
+        # Frames measured at the old level say nothing about the new one
+        self.level = level
+        self.recent.clear()
+        self.calm = 0
+        self.changes += 1
@@ -0,0 +1,78 @@
+# Weapon, enemy, power-up and spawn definitions loaded from content.json.
+#
+# The data file is read once at import and compiled into plain dicts that
+# the game dispatches on: a weapon's "pattern" selects its firing handler,
+# an enemy's "shape" and a power-up's "symbol" select their draw functions.
+# Compiling turns colours into tuples, precomputes each bullet weapon's
+# velocity table (one (dx, dy) per pellet from its angles, side speed and
+# bullet speed) so firing does no trigonometry, and turns an enemy's shot
+# chance into the constant used to draw geometric shot delays. Spawn bands
+# give relative enemy weights from a wave on and compile to the cumulative
+# chances Game.spawn_enemy rolls against. New weapons, enemies and power-ups
+# that reuse existing patterns, shapes and symbols need only a new entry in
+# the data file.
+
+import json
+import math
+import os
+
+CONTENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content.json")
+
+
+def compile_weapon(stats):
+    # Also used for per-game stat overrides, which may change the speeds
+    weapon = dict(stats, color=tuple(stats["color"]))
+    if "angles" in weapon:
+        weapon["velocities"] = tuple(
+            (math.sin(math.radians(angle)) * weapon["side_speed"],
+             -math.cos(math.radians(angle)) * weapon["bullet_speed"])
+            for angle in weapon["angles"]
+        )
+    return weapon
+
+
+def compile_enemy(stats):
+    shot = dict(stats["shot"], color=tuple(stats["shot"]["color"]))
+    # log of the chance of not firing on a tick once the cooldown is over
+    shot["log_miss"] = math.log(1.0 - shot["chance"])
+    return dict(stats, color=tuple(stats["color"]), shot=shot)
+
+
+def compile_power_up(stats):
+    return dict(stats, color=tuple(stats["color"]))
+
+
+def compile_spawns(bands, enemies):
+    # ((first wave, ((cumulative chance, type), ...)), ...) in wave order
+    compiled = []
+    for band in sorted(bands, key=lambda band: band["from_wave"]):
+        weights = band["weights"]
+        unknown = set(weights) - set(enemies)
+        if unknown:
+            raise ValueError(f"spawn band for wave {band['from_wave']} names unknown enemies: "
+                             f"{', '.join(sorted(unknown))}")
+        total = sum(weights.values())
+        running = 0
+        mix = []
+        for name, weight in weights.items():
+            running += weight
+            mix.append((running / total, name))
+        compiled.append((band["from_wave"], tuple(mix)))
+    return tuple(compiled)
+
+
+def load(path=CONTENT_PATH):
+    # (weapons, enemies, power_ups, spawns); the dicts are keyed by name in
+    # file order
+    with open(path) as f:
+        content = json.load(f)
+    enemies = {name: compile_enemy(stats) for name, stats in content["enemies"].items()}
+    return (
+        {name: compile_weapon(stats) for name, stats in content["weapons"].items()},
+        enemies,
+        {name: compile_power_up(stats) for name, stats in content["power_ups"].items()},
+        compile_spawns(content["spawns"], enemies),
+    )
+
+
+WEAPONS, ENEMIES, POWER_UPS, SPAWNS = load()
@@ -0,0 +1,670 @@
+# Array-backed render snapshots, and drawing them on a background thread.
+#
+# Game.capture() copies everything a frame shows into a RenderState: the
+# player and HUD as a few plain values, projectiles, enemies and power-ups
+# as rows of NumPy tables, and enemy bullets and particles as copies of
+# their stores. Once captured a state is not modified until it is captured
+# into again, so it can be drawn while the simulation moves on, and its
+# arrays are reused from frame to frame.
+#
+# draw() and draw_dirty() draw a state, either in full or restoring and
+# reporting only the changed rectangles. RenderWorker runs them on a
+# background thread with two state buffers: the worker draws one while the
+# game loop runs the next ticks and captures into the other. Most of the
+# drawing time is spent inside pygame blits and fills, so on multi-core
+# machines it overlaps the simulation.
+#
+# States hold world coordinates and are drawn scaled to the frame's size, so
+# frames can be rendered at an internal resolution below the world's and
+# then scaled to the window with present().
+#
+# The player, enemies, power-ups and their health bars are blitted from a
+# sprite atlas (render_cache.SpriteAtlas), each group in one Surface.blits()
+# call, instead of being drawn shape by shape.
+
+import threading
+from itertools import chain
+
+import profiler
+from lazy import lazy_import
+from particles import ParticleSystem
+from projectiles import ProjectileStore
+from render_cache import SpriteAtlas, circle_sprite, rect_sprite, render_text, unpack_color
+
+np = lazy_import("numpy")
+pygame = lazy_import("pygame")
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+RED = (255, 50, 50)
+GREEN = (50, 255, 50)
+YELLOW = (255, 255, 50)
+CYAN = (0, 200, 200)
+
+# Above this many changed rects a dirty-rect frame updates the whole screen
+MAX_DIRTY_RECTS = 256
+
+# Projectile kinds
+BULLET, LASER, RAILGUN = range(3)
+
+PROJECTILE_COLUMNS = ("kind", "x", "y", "dx", "dy", "radius", "trail_len", "width", "height", "color")
+ENEMY_COLUMNS = ("x", "y", "speed", "width", "height", "health", "shape", "color")  # health as a fraction
+POWER_UP_COLUMNS = ("x", "y", "speed", "width", "height", "symbol", "color")
+
+
+class Table:
+    # Rows of numbers stored column-wise in float64 arrays
+    def __init__(self, columns, capacity=64):
+        self.columns = columns
+        self.count = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.data = np.zeros((len(self.columns), capacity))
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.count
+
+    def fill(self, rows):
+        # rows is a list of tuples in column order
+        n = len(rows)
+        if n > self.capacity:
+            self._allocate(max(n, self.capacity * 2))
+        if n:
+            k = len(self.columns)
+            self.data[:, :n] = np.fromiter(chain.from_iterable(rows), float, n * k).reshape(n, k).T
+        self.count = n
+
+    def rows(self):
+        # Rows as tuples of Python floats
+        return zip(*self.data[:, :self.count].tolist())
+
+
+class RenderState:
+    def __init__(self):
+        self.background = None
+        self.lag = 0.0
+        self.trail_length = 0
+        self.glow_layers = 0
+        self.player = None  # Values of PLAYER_FIELDS
+        self.score = 0
+        self.wave = 1
+        self.game_over = False
+        self.projectiles = Table(PROJECTILE_COLUMNS)
+        self.enemies = Table(ENEMY_COLUMNS)
+        self.power_ups = Table(POWER_UP_COLUMNS)
+        self.enemy_bullets = ProjectileStore(0, 0)
+        self.particles = ParticleSystem(capacity=256)
+
+    def capture_stores(self, enemy_bullets, particles):
+        # Particle sprites are shared with the live system's cache
+        self.enemy_bullets.copy_from(enemy_bullets)
+        self.particles.copy_from(particles)
+        self.particles.sprites = particles.sprites
+
+
+# Player values in RenderState.player
+PLAYER_FIELDS = ("x", "y", "prev_x", "prev_y", "width", "height", "color", "glow_size", "health",
+                 "max_health", "weapon", "weapon_color", "power_up_timer", "invincible")
+
+
+# States hold world coordinates. Drawing multiplies them by a scale, the
+# frame's size over the world's, so a frame can be rendered at a lower
+# internal resolution than the world and the window (see present()).
+def line_width(width, s):
+    return max(1, round(width * s))
+
+
+# Player, enemy and power-up sprites come from one atlas per scale. Each
+# entry is painted once with the same drawing calls as a direct draw, so
+# blitting it gives the same pixels. Shapes must not use the atlas colour
+# key, magenta.
+ATLASES = {}
+
+
+def get_atlas(s):
+    atlas = ATLASES.get(s)
+    if atlas is None:
+        atlas = ATLASES[s] = SpriteAtlas()
+    return atlas
+
+
+def add_centered(atlas, key, width, height, paint):
+    # Adds a sprite that paint(surface, cx, cy) draws centred on (cx, cy)
+    # within width x height. Blitting the entry's area at (x + x offset,
+    # y + y offset) draws it centred on (x, y).
+    sprite = atlas.blank(width, height)
+    cx, cy = width // 2, height // 2
+    paint(sprite, cx, cy)
+    return atlas.add(key, sprite, (-cx, -cy))
+
+
+def bar_strip(atlas, width, height):
+    # Area of a full green bar followed by a full red one; the width-wide
+    # window starting fill pixels before the red half is a bar filled to fill
+    key = ("bar", width, height)
+    entry = atlas.lookup(key)
+    if entry is None:
+        sprite = atlas.blank(2 * width, height)
+        sprite.fill(GREEN, (0, 0, width, height))
+        sprite.fill(RED, (width, 0, width, height))
+        entry = atlas.add(key, sprite)
+    return entry[0]
+
+
+def bar_area(strip, width, height, fraction):
+    fill = min(max(int(width * fraction), 0), int(width))
+    return (strip.x + int(width) - fill, strip.y, int(width), int(height))
+
+
+def ship_sprite(atlas, color, width, height):
+    key = ("ship", color, width, height)
+    entry = atlas.lookup(key)
+    if entry is None:
+        entry = add_centered(atlas, key, int(width) + 4, int(height) + 4, lambda sheet, x, y: pygame.draw.polygon(
+            sheet, color, [(x, y - height//2), (x - width//2, y + height//2), (x + width//2, y + height//2)]))
+    return entry
+
+
+def glow_sprite(atlas, glow_size, height, s):
+    # Engine glow below a ship of this height, centred on the ship
+    key = ("glow", glow_size, height)
+    entry = atlas.lookup(key)
+    if entry is None:
+        reach = int(height//2 + glow_size * s) + 2
+        entry = add_centered(atlas, key, int(20 * s) + 4, 2 * reach, lambda sheet, x, y: pygame.draw.polygon(
+            sheet, YELLOW, [(x - 10 * s, y + height//2), (x, y + height//2 + glow_size * s), (x + 10 * s, y + height//2)]))
+    return entry
+
+
+def shield_sprite(atlas, s):
+    entry = atlas.lookup("shield")
+    if entry is None:
+        entry = add_centered(atlas, "shield", int(60 * s) + 4, int(60 * s) + 4, lambda sheet, x, y: pygame.draw.circle(
+            sheet, CYAN, (x, y), 30 * s, line_width(2, s)))
+    return entry
+
+
+def draw_player(screen, player, lag, s, atlas):
+    (x, y, prev_x, prev_y, width, height, color, glow_size, health, max_health, weapon, weapon_color,
+     power_up_timer, invincible) = player
+    if lag:
+        x += (prev_x - x) * lag
+        y += (prev_y - y) * lag
+    x *= s
+    y *= s
+    width *= s
+    height *= s
+    items = []
+
+    # Ship and engine glow
+    area, dx, dy = ship_sprite(atlas, color, width, height)
+    items.append((area, (x + dx, y + dy)))
+    area, dx, dy = glow_sprite(atlas, glow_size, height, s)
+    items.append((area, (x + dx, y + dy)))
+
+    # Health bar
+    bar_width = 50 * s
+    bar_height = 6 * s
+    strip = bar_strip(atlas, int(bar_width), int(bar_height))
+    items.append((bar_area(strip, bar_width, bar_height, health / max_health), (x - bar_width//2, y - 40 * s)))
+
+    # Invincibility effect, after the text below
+    if invincible > 0:
+        area, dx, dy = shield_sprite(atlas, s)
+        shield = (area, (x + dx, y + dy))
+
+    sheet = atlas.surface
+    blits = [(sheet, dest, area) for area, dest in items]
+
+    # Weapon indicator, and the power-up timer if active
+    weapon_text = render_text(round(20 * s), f"Weapon: {weapon}", weapon_color)
+    blits.append((weapon_text, (x - weapon_text.get_width()//2, y - 60 * s)))
+    if power_up_timer > 0:
+        timer_text = render_text(round(20 * s), f"{power_up_timer//60}s", YELLOW)
+        blits.append((timer_text, (x - timer_text.get_width()//2, y - 80 * s)))
+    if invincible > 0:
+        blits.append((sheet, shield[1], shield[0]))
+
+    rects = screen.blits(blits)
+    return rects[0].unionall(rects[1:])
+
+
+def sprite_column(keys, make):
+    # The sprite for each of an array of integer keys, calling make() once
+    # per distinct key
+    distinct, inverse = np.unique(keys, return_inverse=True)
+    surfs = [make(key) for key in distinct.tolist()]
+    return map(surfs.__getitem__, inverse.tolist())
+
+
+# Bullet sprites by key: packed color, radius << 24 and, for trails,
+# alpha << 32
+def bullet_body_sprite(key):
+    return circle_sprite((key >> 24) & 0xFF, unpack_color(key & 0xFFFFFF))
+
+
+def bullet_trail_sprite(key):
+    return circle_sprite((key >> 24) & 0xFF, unpack_color(key & 0xFFFFFF), key >> 32)
+
+
+def bullet_core_sprite(radius):
+    return circle_sprite(radius - 1, WHITE)
+
+
+def draw_bullets(screen, bullets, trail_length, lag, s, rects=None):
+    # All player bullets in one batch: every trail (oldest positions first),
+    # then the bodies and white cores. bullets is a block of
+    # PROJECTILE_COLUMNS rows, one column per bullet, in world units. Trail
+    # positions lie behind a bullet along its velocity; only the newest
+    # trail_length of them are drawn. When rects is a list, the blitted
+    # areas are appended to it.
+    _, x, y, dx, dy, radius, trail_len, _, _, color = bullets
+    x = x * s
+    y = y * s
+    dx = dx * s
+    dy = dy * s
+    if s == 1:
+        radius = radius.astype(np.int64)
+    else:
+        radius = np.maximum(2, np.round(radius * s)).astype(np.int64)  # Room for the core
+    trail_len = trail_len.astype(np.int64)
+    key = color.astype(np.int64) | (radius << 24)  # Packed color and radius
+    blits = []
+    for k in range(trail_length, 0, -1):
+        # k ticks back along the velocity; present if the bullet is that old
+        idx = np.flatnonzero(trail_len >= k)
+        if len(idx) == 0:
+            continue
+        r = radius[idx]
+        back = k + lag
+        left = (x[idx] - back * dx[idx] - r).tolist()
+        top = (y[idx] - back * dy[idx] - r).tolist()
+        alpha = 100 - (trail_len[idx] - k) * 20
+        surfs = sprite_column(key[idx] | (alpha << 32), bullet_trail_sprite)
+        blits.extend(zip(surfs, zip(left, top)))
+    if lag:
+        x = x - dx * lag
+        y = y - dy * lag
+    left = x.astype(np.int64) - radius
+    top = y.astype(np.int64) - radius
+    bodies = zip(sprite_column(key, bullet_body_sprite), zip(left.tolist(), top.tolist()))
+    cores = zip(sprite_column(radius, bullet_core_sprite), zip((left + 1).tolist(), (top + 1).tolist()))
+    blits.extend(chain.from_iterable(zip(bodies, cores)))
+    blit_rects = screen.blits(blits, doreturn=rects is not None)
+    if rects is not None:
+        rects.extend(blit_rects)
+
+
+def draw_laser(screen, x, y, width, height, color, glow_layers, s):
+    # Draw main beam
+    dirty = pygame.draw.rect(screen, color, (x - width//2, y, width, height))
+
+    # Draw glow effect (cached full-height columns cropped to the beam)
+    for i in range(glow_layers):
+        glow_width = round((width + i * 6) * s)
+        alpha = 150 - i * 50
+        glow_surf = rect_sprite(glow_width, screen.get_height(), color, alpha)
+        dirty.union_ip(screen.blit(glow_surf, (x - glow_width//2, y), (0, 0, glow_width, height)))
+    return dirty
+
+
+def draw_railgun(screen, x, y, width, height, color, glow_layers, s):
+    # Draw main beam with bright core
+    dirty = pygame.draw.rect(screen, WHITE, (x - width//2, y, width, height))
+
+    # Draw outer glow (cached full-height columns cropped to the beam)
+    for i in range(1, glow_layers + 1):
+        glow_width = round((width + i * 4) * s)
+        alpha = 100 - i * 25
+        glow_surf = rect_sprite(glow_width, screen.get_height(), color, alpha)
+        dirty.union_ip(screen.blit(glow_surf, (x - glow_width//2, y), (0, 0, glow_width, height)))
+    return dirty
+
+
+# Enemy bodies by shape, centred on (x, y) in frame pixels; each returns the
+# body's rect
+def draw_block(screen, x, y, width, height, color):
+    dirty = pygame.draw.rect(screen, color, (x - width//2, y - height//2, width, height))
+    # Draw details
+    pygame.draw.rect(screen, BLACK, (x - width//4, y - height//4, width//2, height//2))
+    return dirty
+
+
+def draw_triangle(screen, x, y, width, height, color):
+    return pygame.draw.polygon(screen, color, [
+        (x, y - height//2),
+        (x - width//2, y + height//2),
+        (x + width//2, y + height//2)
+    ])
+
+
+def draw_ring(screen, x, y, width, height, color):
+    dirty = pygame.draw.circle(screen, color, (x, y), width//2)
+    pygame.draw.circle(screen, BLACK, (x, y), width//4)
+    return dirty
+
+
+ENEMY_SHAPES = {
+    "block": draw_block,
+    "triangle": draw_triangle,
+    "ring": draw_ring,
+}
+
+
+def enemy_sprite(atlas, shape, width, height, color):
+    # shape is a SHAPE_CODES value and color packed
+    key = ("enemy", shape, width, height, color)
+    entry = atlas.lookup(key)
+    if entry is None:
+        draw_shape = SHAPES_BY_CODE[shape]
+        entry = add_centered(atlas, key, int(width) + 4, int(height) + 4, lambda sheet, x, y: draw_shape(
+            sheet, x, y, width, height, unpack_color(color)))
+    return entry
+
+
+def power_up_sprite(atlas, symbol, width, height, color, s):
+    # Body and symbol; symbol is a SYMBOL_CODES value and color packed
+    key = ("power_up", symbol, width, height, color)
+    entry = atlas.lookup(key)
+    if entry is None:
+        draw_symbol = SYMBOLS_BY_CODE[symbol]
+
+        def paint(sheet, x, y):
+            pygame.draw.rect(sheet, unpack_color(color), (x - width//2, y - height//2, width, height))
+            draw_symbol(sheet, x, y, s)
+        entry = add_centered(atlas, key, int(width) + 4, int(height) + 4, paint)
+    return entry
+
+
+# Power-up symbols, drawn in white centred on (x, y) in frame pixels
+def draw_cross(screen, x, y, s):
+    pygame.draw.rect(screen, WHITE, (x - 5 * s, y - 8 * s, 10 * s, 16 * s), line_width(2, s))
+    pygame.draw.rect(screen, WHITE, (x - 8 * s, y - 5 * s, 16 * s, 10 * s), line_width(2, s))
+
+
+def draw_shotgun(screen, x, y, s):
+    pygame.draw.rect(screen, WHITE, (x - 6 * s, y, 12 * s, 4 * s))
+    pygame.draw.circle(screen, WHITE, (x, y - 4 * s), 3 * s)
+
+
+def draw_laser_symbol(screen, x, y, s):
+    pygame.draw.line(screen, WHITE, (x, y - 6 * s), (x, y + 6 * s), line_width(3, s))
+
+
+def draw_burst(screen, x, y, s):
+    for i in range(3):
+        pygame.draw.circle(screen, WHITE, (x + (i*4 - 4) * s, y), 2 * s)
+
+
+def draw_spread(screen, x, y, s):
+    width = line_width(2, s)
+    pygame.draw.line(screen, WHITE, (x, y), (x - 5 * s, y - 5 * s), width)
+    pygame.draw.line(screen, WHITE, (x, y), (x, y - 6 * s), width)
+    pygame.draw.line(screen, WHITE, (x, y), (x + 5 * s, y - 5 * s), width)
+
+
+def draw_railgun_symbol(screen, x, y, s):
+    pygame.draw.line(screen, WHITE, (x, y - 6 * s), (x, y + 6 * s), line_width(2, s))
+    pygame.draw.rect(screen, WHITE, (x - 3 * s, y - 3 * s, 6 * s, 6 * s))
+
+
+POWER_UP_SYMBOLS = {
+    "cross": draw_cross,
+    "shotgun": draw_shotgun,
+    "laser": draw_laser_symbol,
+    "burst": draw_burst,
+    "spread": draw_spread,
+    "railgun": draw_railgun_symbol,
+}
+
+# Table codes for shapes and symbols
+SHAPE_CODES = {name: i for i, name in enumerate(ENEMY_SHAPES)}
+SYMBOL_CODES = {name: i for i, name in enumerate(POWER_UP_SYMBOLS)}
+SHAPES_BY_CODE = list(ENEMY_SHAPES.values())
+SYMBOLS_BY_CODE = list(POWER_UP_SYMBOLS.values())
+
+
+def frame_scale(screen, state):
+    # Frame pixels per world unit
+    return screen.get_width() / state.background.get_width()
+
+
+SCALED_BACKGROUNDS = {}
+
+
+def scaled_background(screen, state):
+    # The world-sized background resized to the frame, once per background
+    # and size
+    background = state.background
+    size = screen.get_size()
+    if background.get_size() == size:
+        return background
+    key = (background, size)
+    surf = SCALED_BACKGROUNDS.get(key)
+    if surf is None:
+        if len(SCALED_BACKGROUNDS) >= 4:
+            SCALED_BACKGROUNDS.clear()
+        surf = SCALED_BACKGROUNDS[key] = pygame.transform.smoothscale(background, size)
+    return surf
+
+
+def draw_scene(screen, state, rects=None, prof=profiler.NULL_PROFILER):
+    # Draws everything on top of the background. When rects is a list, the
+    # area touched by each drawn item is appended to it. Moving things are
+    # drawn state.lag ticks back towards where they were at the previous
+    # tick, interpolating between ticks.
+    lag = state.lag
+    s = frame_scale(screen, state)
+    atlas = get_atlas(s)
+    drawn = []
+
+    # Draw player
+    drawn.append(draw_player(screen, state.player, lag, s, atlas))
+    prof.lap(profiler.DRAW_PLAYER)
+
+    # Draw beams, then all bullets in one batch
+    trail_length = state.trail_length
+    glow_layers = state.glow_layers
+    projectiles = state.projectiles
+    data = projectiles.data[:, :projectiles.count]
+    is_bullet = data[0] == BULLET
+    for kind, x, y, _, _, _, _, width, height, color in data[:, ~is_bullet].T.tolist():
+        color = unpack_color(int(color))
+        if kind == LASER:
+            drawn.append(draw_laser(screen, x * s, y * s, round(width * s), int(height * s), color, glow_layers, s))
+        else:
+            drawn.append(draw_railgun(screen, x * s, y * s, round(width * s), int(height * s), color, glow_layers, s))
+    if is_bullet.any():
+        draw_bullets(screen, data[:, is_bullet], trail_length, lag, s, rects)
+    prof.lap(profiler.DRAW_BULLETS)
+
+    # Draw enemies (bodies and health bars in one batch), then all enemy
+    # bullets in one batch
+    items = []
+    for x, y, speed, width, height, health, shape, color in state.enemies.rows():
+        if lag:
+            y -= speed * lag
+        x *= s
+        y *= s
+        width = int(width) * s
+        height = int(height) * s
+        area, dx, dy = enemy_sprite(atlas, int(shape), width, height, int(color))
+        items.append((area, (x + dx, y + dy)))
+        bar_height = 4 * s
+        strip = bar_strip(atlas, int(width), int(bar_height))
+        items.append((bar_area(strip, width, bar_height, health), (x - width//2, y - height//2 - 10 * s)))
+    if items:
+        sheet = atlas.surface
+        enemy_rects = screen.blits([(sheet, dest, area) for area, dest in items])
+        drawn.extend(body.union(bar) for body, bar in zip(enemy_rects[::2], enemy_rects[1::2]))
+    state.enemy_bullets.draw(screen, rects, trail_length, lag, s)
+    prof.lap(profiler.DRAW_ENEMIES)
+
+    # Draw power-ups in one batch. The symbol always fits inside the body,
+    # so the sprite's rect is the dirty area.
+    items = []
+    for x, y, speed, width, height, symbol, color in state.power_ups.rows():
+        if lag:
+            y -= speed * lag
+        x *= s
+        y *= s
+        area, dx, dy = power_up_sprite(atlas, int(symbol), int(width) * s, int(height) * s, int(color), s)
+        items.append((area, (x + dx, y + dy)))
+    if items:
+        sheet = atlas.surface
+        drawn.extend(screen.blits([(sheet, dest, area) for area, dest in items]))
+    prof.lap(profiler.DRAW_POWER_UPS)
+
+    # Draw particles
+    state.particles.draw(screen, rects, lag, s)
+    prof.lap(profiler.DRAW_PARTICLES)
+
+    # Draw HUD
+    screen_width, screen_height = screen.get_size()
+    margin = 10 * s
+    score_text = render_text(round(36 * s), f"Score: {state.score}", WHITE)
+    drawn.append(screen.blit(score_text, (margin, margin)))
+
+    wave_text = render_text(round(36 * s), f"Wave: {state.wave}", WHITE)
+    drawn.append(screen.blit(wave_text, (screen_width - wave_text.get_width() - margin, margin)))
+
+    # Draw game over screen
+    if state.game_over:
+        overlay = rect_sprite(screen_width, screen_height, BLACK, 180)
+        drawn.append(screen.blit(overlay, (0, 0)))
+
+        game_over_text = render_text(round(72 * s), "GAME OVER", RED)
+        screen.blit(game_over_text, (screen_width//2 - game_over_text.get_width()//2, screen_height//2 - 50 * s))
+
+        final_score_text = render_text(round(48 * s), f"Final Score: {state.score}", WHITE)
+        screen.blit(final_score_text, (screen_width//2 - final_score_text.get_width()//2, screen_height//2 + 20 * s))
+
+        restart_text = render_text(round(36 * s), "Press R to Restart", GREEN)
+        screen.blit(restart_text, (screen_width//2 - restart_text.get_width()//2, screen_height//2 + 80 * s))
+
+    if rects is not None:
+        rects.extend(rect for rect in drawn if rect)
+    prof.lap(profiler.DRAW_HUD)
+
+
+def draw(screen, state, prof=profiler.NULL_PROFILER):
+    # Full redraw; the caller flips the whole display
+    screen.blit(scaled_background(screen, state), (0, 0))
+    prof.lap(profiler.DRAW_BACKGROUND)
+    draw_scene(screen, state, prof=prof)
+
+
+def draw_dirty(screen, state, previous, prof=profiler.NULL_PROFILER):
+    # Dirty-rectangle redraw: restores the background only under previous
+    # (the rects drawn last frame), draws the new frame and returns
+    # (changed rects for pygame.display.update(), rects drawn this frame).
+    # Falls back to a full-screen update when previous is None or too many
+    # rects changed.
+    background = scaled_background(screen, state)
+    bounds = screen.get_rect()
+    if previous is None or len(previous) > MAX_DIRTY_RECTS:
+        screen.blit(background, (0, 0))
+        previous = [bounds]
+    else:
+        screen.blits([(background, rect, rect) for rect in previous], doreturn=False)
+    prof.lap(profiler.DRAW_BACKGROUND)
+
+    rects = []
+    draw_scene(screen, state, rects, prof)
+    drawn = [rect.clip(bounds) for rect in rects]
+
+    changed = previous + drawn
+    if len(changed) > MAX_DIRTY_RECTS:
+        return [bounds], drawn
+    return changed, drawn
+
+
+def present(frame, screen):
+    # Scale a frame rendered at the internal resolution to the window in a
+    # single blit
+    pygame.transform.scale(frame, screen.get_size(), screen)
+
+
+class RenderWorker:
+    # Draws captured states to screen on a background thread. Per frame the
+    # game loop calls wait(), presents the finished frame, captures the next
+    # state into free_state() and passes it to submit(). When frame is a
+    # separate surface, states are drawn into it and then scaled to screen.
+    def __init__(self, screen, dirty_rects=False, frame=None):
+        self.screen = screen
+        self.frame = frame if frame is not None else screen
+        self.dirty_rects = dirty_rects
+        self.states = [RenderState(), RenderState()]
+        self.pending = None
+        self.background = None
+        self.drawn = []  # Rects drawn last frame, for dirty-rect redraws
+        self.changed = []
+        self.timer = profiler.LapTimer()  # Drawing time, see FrameProfiler.add()
+        self.ready = threading.Condition()
+        self.done = True
+        self.running = True
+        self.error = None  # Raised by drawing; stops the worker
+        self.thread = threading.Thread(target=self.run, name="render", daemon=True)
+        self.thread.start()
+
+    def free_state(self):
+        # The buffer not being drawn (or last drawn)
+        return self.states[0]
+
+    def submit(self, state):
+        with self.ready:
+            if self.error is not None:
+                raise self.error
+            self.states.reverse()
+            self.pending = state
+            self.done = False
+            self.ready.notify_all()
+
+    def wait(self):
+        # Block until the submitted state is drawn; returns the changed
+        # rects, or None when the whole screen needs updating
+        with self.ready:
+            while not self.done:
+                self.ready.wait()
+            if self.error is not None:
+                raise self.error
+        return self.changed if self.dirty_rects and self.frame is self.screen else None
+
+    def close(self):
+        with self.ready:
+            self.running = False
+            self.ready.notify_all()
+        self.thread.join()
+
+    def run(self):
+        while True:
+            with self.ready:
+                while self.running and self.pending is None:
+                    self.ready.wait()
+                if not self.running:
+                    return
+                state = self.pending
+                self.pending = None
+            try:
+                self.timer.begin()
+                if self.dirty_rects:
+                    # A new background (restarted game) needs a full redraw
+                    previous = self.drawn if state.background is self.background else None
+                    self.changed, self.drawn = draw_dirty(self.frame, state, previous, self.timer)
+                else:
+                    draw(self.frame, state, self.timer)
+                if self.frame is not self.screen:
+                    present(self.frame, self.screen)
+                    self.timer.lap(profiler.SCALE)
+                self.background = state.background
+            except BaseException as error:
+                # Handed to the game loop by wait() or submit()
+                self.error = error
+            finally:
+                with self.ready:
+                    self.done = True
+                    self.ready.notify_all()
+            if self.error is not None:
+                return
@@ -0,0 +1,167 @@
+# Caches of pre-rendered surfaces shared by the draw methods.
+#
+# Shapes that used to be drawn into a fresh SRCALPHA surface every frame
+# (bullet trails, particles, beam glows, overlays) are rendered once per key,
+# converted to the display's pixel format when a display exists, and kept in
+# a bounded LRU cache. The font module is initialized on first use, fonts are
+# loaded once per size and rendered text is memoized the same way, so HUD
+# text is only rasterized when it changes.
+#
+# Opaque entity sprites (enemy bodies, power-ups, the player ship, health
+# bar strips) are packed into a SpriteAtlas instead: one colour-keyed sheet,
+# so a whole group of them is drawn with a single Surface.blits() call.
+
+from collections import OrderedDict
+
+from lazy import lazy_import
+
+pygame = lazy_import("pygame")
+
+
+# Colours are stored in NumPy arrays and render snapshots as 0xRRGGBB ints
+def pack_color(color):
+    return (color[0] << 16) | (color[1] << 8) | color[2]
+
+
+COLORS = {}
+
+
+def unpack_color(packed):
+    color = COLORS.get(packed)
+    if color is None:
+        color = COLORS[packed] = ((packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF)
+    return color
+
+
+class SurfaceCache:
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def clear(self):
+        self.surfaces.clear()
+
+    def lookup(self, key):
+        surf = self.surfaces.get(key)
+        if surf is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.surfaces.move_to_end(key)
+        return surf
+
+    def add(self, key, surf):
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert_alpha()
+        self.surfaces[key] = surf
+        if len(self.surfaces) > self.maxsize:
+            self.surfaces.popitem(last=False)
+        return surf
+
+
+sprites = SurfaceCache()
+
+
+class SpriteAtlas:
+    # Sprites are packed, trimmed to their visible pixels, into rows
+    # ("shelves") of one sheet that grows downwards as needed. Pixels in
+    # the colour key are transparent when blitting from the sheet.
+    def __init__(self, width=512, colorkey=(255, 0, 255)):
+        self.width = width
+        self.colorkey = colorkey
+        self.surface = None
+        self.entries = {}
+        self.shelf_x = 0
+        self.shelf_y = 0
+        self.shelf_height = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _allocate(self, height):
+        surf = pygame.Surface((self.width, height))
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert()
+        surf.fill(self.colorkey)
+        surf.set_colorkey(self.colorkey, pygame.RLEACCEL)
+        if self.surface is not None:
+            surf.blit(self.surface, (0, 0))
+        self.surface = surf
+
+    def blank(self, width, height):
+        # A transparent surface to paint a sprite on before add()
+        surf = pygame.Surface((width, height))
+        surf.fill(self.colorkey)
+        surf.set_colorkey(self.colorkey)
+        return surf
+
+    def lookup(self, key):
+        return self.entries.get(key)
+
+    def add(self, key, sprite, offset=(0, 0)):
+        # Packs sprite (from blank()) and returns its entry, (area on the
+        # sheet, x offset, y offset): blitting area at a point plus the
+        # offsets draws the sprite with its top-left corner at the point
+        # plus offset
+        bounds = sprite.get_bounding_rect()
+        width = min(bounds.width, self.width)
+        height = bounds.height
+        if self.shelf_x + width > self.width:
+            self.shelf_y += self.shelf_height
+            self.shelf_x = 0
+            self.shelf_height = 0
+        if self.surface is None or self.shelf_y + height > self.surface.get_height():
+            self._allocate(max(self.shelf_y + height, 2 * self.surface.get_height() if self.surface else 256))
+        area = pygame.Rect(self.shelf_x, self.shelf_y, width, height)
+        self.surface.blit(sprite, area, bounds)
+        self.shelf_x += width
+        self.shelf_height = max(self.shelf_height, height)
+        entry = self.entries[key] = (area, offset[0] + bounds.x, offset[1] + bounds.y)
+        return entry
+
+
+def circle_sprite(radius, color, alpha=255):
+    key = ("circle", radius, color, alpha)
+    surf = sprites.lookup(key)
+    if surf is None:
+        surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(surf, (*color, alpha), (radius, radius), radius)
+        surf = sprites.add(key, surf)
+    return surf
+
+
+def rect_sprite(width, height, color, alpha=255):
+    key = ("rect", width, height, color, alpha)
+    surf = sprites.lookup(key)
+    if surf is None:
+        surf = pygame.Surface((width, height), pygame.SRCALPHA)
+        surf.fill((*color, alpha))
+        surf = sprites.add(key, surf)
+    return surf
+
+
+texts = SurfaceCache(maxsize=256)
+_fonts = {}
+
+
+def get_font(size):
+    font = _fonts.get(size)
+    if font is None:
+        # The default font needs no system font scan, unlike SysFont
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
+
+
+def render_text(size, text, color):
+    key = (size, text, color)
+    surf = texts.lookup(key)
+    if surf is None:
+        surf = texts.add(key, get_font(size).render(text, True, color))
+    return surf
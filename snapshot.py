@@ -0,0 +1,255 @@
+# Binary snapshots of a complete Game for rollback and checkpoints.
+#
+# snapshot() flattens the game into nested tuples of plain values (numbers,
+# strings, bytes): every entity's fields, the scheduled events, difficulty
+# tuning, the particle and enemy bullet arrays as raw bytes and the state of
+# all three random generators. Object references such as a beam's
+# damaged_enemies or an enemy's pending shot become indices into
+# Game.enemies. The tuple is written with marshal behind a small versioned
+# header, which keeps both directions in C for the bulk of the work. Unlike
+# pickle, marshal only builds plain values and never imports or calls
+# anything, so loading a snapshot from elsewhere cannot run code.
+#
+# restore() rebuilds the state into a new Game, or in place into an existing
+# one for rollback, recycling its current bullets:
+#
+#   blob = snapshot(game)
+#   ...
+#   restore(blob, game)
+#
+#   python snapshot.py session.psr --at 3000 -o wave3.snap
+#       replay a recorded session to tick 3000 and save the state
+
+import argparse
+import marshal
+import struct
+from array import array
+
+import numpy as np
+
+from game import ENEMY_SHOT, ENEMY_SPAWN, TUNING, Bullet, Enemy, Game, LaserBeam, PowerUp, RailgunBeam, recycle
+from render import BULLET, LASER, RAILGUN
+
+MAGIC = b"PSSN"
+VERSION = 5
+HEADER = struct.Struct("<4sB")  # magic, version
+
+PLAYER_FIELDS = ("x", "y", "prev_x", "prev_y", "width", "height", "speed", "color", "health", "max_health",
+                 "weapon", "last_shot", "score", "invincible_until", "power_up_until", "power_up_type",
+                 "burst_count", "burst_delay", "burst_last_shot")
+ENEMY_FIELDS = ("x", "y", "type", "width", "height", "speed", "health", "color",
+                "score_value", "max_health")
+POWER_UP_FIELDS = ("x", "y", "width", "height", "speed", "type", "color")
+PARTICLE_ARRAYS = ("x", "y", "speed_x", "speed_y", "size", "life", "color")
+ENEMY_BULLET_ARRAYS = ("x", "y", "dx", "dy", "damage", "age", "color")
+GAME_FIELDS = ("seed", "last_spawn", "score", "game_over", "wave", "enemies_killed", "ticks")
+
+BEAM_CLASSES = {LaserBeam: LASER, RailgunBeam: RAILGUN}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def save_rng(rng):
+    # random.Random state as (version, raw Mersenne Twister words, gauss_next)
+    version, words, gauss_next = rng.getstate()
+    return version, array("I", words).tobytes(), gauss_next
+
+
+def load_rng(rng, state):
+    version, words, gauss_next = state
+    rng.setstate((version, tuple(array("I", words)), gauss_next))
+
+
+def save_arrays(store, names):
+    # (count, raw bytes of each live array) for a struct-of-arrays store
+    n = store.count
+    return n, tuple(getattr(store, name)[:n].tobytes() for name in names)
+
+
+def load_arrays(store, names, state):
+    n, data = state
+    store.count = 0
+    if n > store.capacity:
+        store._allocate(n)
+    for name, raw in zip(names, data):
+        array = getattr(store, name)
+        array[:n] = np.frombuffer(raw, array.dtype)
+    store.count = n
+
+
+def save_bullet(bullet):
+    return (bullet.x, bullet.y, bullet.dx, bullet.dy, bullet.damage, bullet.color, bullet.source,
+            bullet.radius, bullet.trail_len)
+
+
+def load_bullet(record):
+    x, y, dx, dy, damage, color, source, radius, trail_len = record
+    bullet = Bullet.spawn(x, y, dx, dy, damage, color, source)
+    bullet.radius = radius
+    bullet.trail_len = trail_len
+    return bullet
+
+
+def save_projectile(projectile, enemy_index):
+    kind = BEAM_CLASSES.get(type(projectile))
+    if kind is None:
+        return (BULLET, save_bullet(projectile))
+    # Enemies already removed from the game cannot be hit again, so only
+    # live ones need to be remembered
+    damaged = tuple(enemy_index[id(enemy)] for enemy in projectile.damaged_enemies if id(enemy) in enemy_index)
+    return (kind, (projectile.x, projectile.y, projectile.damage, projectile.color, projectile.source,
+                   projectile.width, projectile.height, projectile.active, projectile.timer, damaged))
+
+
+def load_projectile(record, enemies):
+    kind, fields = record
+    if kind == BULLET:
+        return load_bullet(fields)
+    x, y, damage, color, source, width, height, active, timer, damaged = fields
+    beam = (LaserBeam if kind == LASER else RailgunBeam).spawn(x, y, damage, color, source)
+    beam.width = width
+    beam.height = height
+    beam.active = active
+    beam.timer = timer
+    beam.damaged_enemies = {enemies[i] for i in damaged}
+    return beam
+
+
+def save_events(events, enemy_index):
+    # Pending events as (tick, kind, seq, enemy index or None)
+    return events.now, events.seq, tuple((tick, kind, seq, enemy_index[id(target)] if kind == ENEMY_SHOT else None)
+                                         for tick, kind, seq, target in events.pending())
+
+
+def load_events(game, state):
+    now, seq, entries = state
+    events = game.events
+    events.now = now
+    events.seq = seq
+    events.heap = []  # Sorted entries form a valid heap
+    for tick, kind, seq, target in entries:
+        entry = [tick, kind, seq, None]
+        if kind == ENEMY_SHOT:
+            entry[3] = game.enemies[target]
+            entry[3].shot = entry
+        elif kind == ENEMY_SPAWN:
+            game.spawn_event = entry
+        events.heap.append(entry)
+
+
+def snapshot(game):
+    # Serialize the full simulation state of game to bytes
+    player = game.player
+    particles = game.particles
+    enemy_index = {id(enemy): i for i, enemy in enumerate(game.enemies)}
+    state = (
+        tuple(getattr(game, name) for name in GAME_FIELDS),
+        tuple(getattr(game, name) for name in TUNING),
+        (dict(game.kills_by_weapon), dict(game.weapon_ticks), tuple(game.background_stars)),
+        save_rng(game.rng),
+        tuple(getattr(player, name) for name in PLAYER_FIELDS),
+        player.weapons,
+        save_rng(player.fx_rng),
+        tuple(tuple(getattr(enemy, name) for name in ENEMY_FIELDS) for enemy in game.enemies),
+        save_arrays(game.enemy_bullets, ENEMY_BULLET_ARRAYS),
+        tuple(save_projectile(projectile, enemy_index) for projectile in game.bullets),
+        save_events(game.events, enemy_index),
+        tuple(tuple(getattr(power_up, name) for name in POWER_UP_FIELDS) for power_up in game.power_ups),
+        save_arrays(particles, PARTICLE_ARRAYS) + (particles.rng.bit_generator.state,),
+    )
+    return HEADER.pack(MAGIC, VERSION) + marshal.dumps(state)
+
+
+def restore(blob, game=None):
+    # Rebuild the state saved by snapshot(). With game, the state replaces
+    # that game's in place; otherwise a new Game is created. Returns the game.
+    magic, version = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise SnapshotError("not a Pixel Shooter snapshot")
+    if version != VERSION:
+        raise SnapshotError(f"unsupported snapshot version {version}")
+    try:
+        (fields, tuning, (kills_by_weapon, weapon_ticks, stars), rng_state, player_fields, weapons,
+         fx_rng_state, enemies, enemy_bullets, projectiles, events, power_ups,
+         (n, particle_arrays, particle_rng_state)) = marshal.loads(memoryview(blob)[HEADER.size:])
+    except (EOFError, TypeError, ValueError) as error:
+        raise SnapshotError(f"corrupt snapshot: {error}") from None
+
+    tuning = dict(zip(TUNING, tuning))
+    if game is None:
+        game = Game(fields[0], tuning)
+    else:
+        for bullet in game.bullets:
+            recycle(bullet)
+        for name, value in tuning.items():
+            setattr(game, name, value)
+        if stars != tuple(game.background_stars):
+            game.background = None
+    for name, value in zip(GAME_FIELDS, fields):
+        setattr(game, name, value)
+    game.kills_by_weapon = dict(kills_by_weapon)
+    game.weapon_ticks = dict(weapon_ticks)
+    game.background_stars = list(stars)
+    load_rng(game.rng, rng_state)
+
+    player = game.player
+    for name, value in zip(PLAYER_FIELDS, player_fields):
+        setattr(player, name, value)
+    player.weapons = weapons
+    load_rng(player.fx_rng, fx_rng_state)
+
+    game.enemies = []
+    for record in enemies:
+        enemy = Enemy(record[0], record[1], record[2])
+        for name, value in zip(ENEMY_FIELDS, record):
+            setattr(enemy, name, value)
+        game.enemies.append(enemy)
+    load_arrays(game.enemy_bullets, ENEMY_BULLET_ARRAYS, enemy_bullets)
+    game.bullets = [load_projectile(record, game.enemies) for record in projectiles]
+    load_events(game, events)
+    game.power_ups = []
+    for record in power_ups:
+        power_up = PowerUp(record[0], record[1], record[5])
+        for name, value in zip(POWER_UP_FIELDS, record):
+            setattr(power_up, name, value)
+        game.power_ups.append(power_up)
+
+    particles = game.particles
+    load_arrays(particles, PARTICLE_ARRAYS, (n, particle_arrays))
+    particles.rng.bit_generator.state = particle_rng_state
+    return game
+
+
+def save(game, path):
+    with open(path, "wb") as f:
+        f.write(snapshot(game))
+
+
+def load(path, game=None):
+    with open(path, "rb") as f:
+        return restore(f.read(), game)
+
+
+def main():
+    from replay import InputLog
+
+    parser = argparse.ArgumentParser(description="Save a Pixel Shooter snapshot from a recorded session")
+    parser.add_argument("log", help="input log written by 'game.py --record'")
+    parser.add_argument("--at", type=int, required=True, metavar="TICK", help="tick to snapshot at")
+    parser.add_argument("-o", "--out", required=True, metavar="PATH", help="snapshot file to write")
+    args = parser.parse_args()
+
+    log = InputLog.load(args.log)
+    if args.at > len(log):
+        parser.error(f"the log only has {len(log)} ticks")
+    game = Game(seed=log.seed)
+    game.step(args.at, log.inputs)
+    save(game, args.out)
+    print(f"tick {game.ticks}: wave {game.wave}, score {game.score}, {len(game.enemies)} enemies, "
+          f"{len(game.bullets)} bullets -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
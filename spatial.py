@@ -0,0 +1,75 @@
+# Collision broadphase structures: a uniform-grid spatial hash for boxes and
+# a sorted column index for full-height beams.
+#
+# Items are inserted with their axis-aligned bounding box and a query returns
+# every item whose box shares a grid cell with the query box. Callers still
+# run their exact overlap test on the candidates, so hit rules stay the same.
+# Items are usually list indices, which lets queries hand candidates back in
+# list order.
+
+from bisect import bisect_left, bisect_right
+
+
+class SpatialHash:
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def clear(self):
+        self.cells.clear()
+
+    def insert(self, item, left, top, right, bottom):
+        size = self.cell_size
+        cells = self.cells
+        x0, x1 = int(left // size), int(right // size)
+        y0, y1 = int(top // size), int(bottom // size)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = [item]
+                else:
+                    bucket.append(item)
+
+    def query(self, left, top, right, bottom):
+        # Returns candidates sorted and without duplicates
+        size = self.cell_size
+        cells = self.cells
+        x0, x1 = int(left // size), int(right // size)
+        y0, y1 = int(top // size), int(bottom // size)
+        if x0 == x1 and y0 == y1:
+            bucket = cells.get((x0, y0))
+            # Items enter each bucket once and in insertion order
+            return bucket if bucket is not None else ()
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is not None:
+                    found.update(bucket)
+        return sorted(found)
+
+
+# Items indexed by the x coordinate of their centre. Kept sorted so a
+# vertical column query is a bisect plus a scan of the items it overlaps,
+# O(log n + k) per query.
+class ColumnIndex:
+    def __init__(self):
+        self.xs = []
+        self.items = []
+        self.max_half_width = 0
+
+    def rebuild(self, entries):
+        # entries: iterable of (x, half_width, item)
+        entries = sorted(entries, key=lambda entry: entry[0])
+        self.xs = [entry[0] for entry in entries]
+        self.items = [entry[2] for entry in entries]
+        self.max_half_width = max((entry[1] for entry in entries), default=0)
+
+    def query(self, x, half_width):
+        # Candidates whose extent may overlap the open column
+        # (x - half_width, x + half_width), sorted and without duplicates
+        reach = half_width + self.max_half_width
+        lo = bisect_right(self.xs, x - reach)
+        hi = bisect_left(self.xs, x + reach, lo)
+        return sorted(self.items[lo:hi])
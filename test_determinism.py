@@ -0,0 +1,94 @@
+import marshal
+import random
+
+import pytest
+
+from game import INPUT_DOWN, INPUT_FIRE, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, Game
+from replay import InputLog, ReplayDesyncError, replay
+from snapshot import HEADER, SnapshotError, restore, snapshot
+
+SEED = 1234
+TICKS = 1800
+
+
+def random_inputs(n, seed=0):
+    # Held inputs that change every few ticks, like a player would press them
+    rng = random.Random(seed)
+    moves = [0, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN, INPUT_LEFT | INPUT_UP, INPUT_RIGHT | INPUT_DOWN]
+    inputs = []
+    while len(inputs) < n:
+        held = rng.choice(moves) | (INPUT_FIRE if rng.random() < 0.8 else 0)
+        inputs += [held] * rng.randint(1, 20)
+    return inputs[:n]
+
+
+def record(inputs, checksum_every=30):
+    game = Game(seed=SEED)
+    log = InputLog(SEED, checksum_every=checksum_every)
+    for tick_inputs in inputs:
+        game.tick(tick_inputs)
+        log.record(tick_inputs, game)
+    return game, log
+
+
+def test_replay_matches_recording():
+    game, log = record(random_inputs(TICKS))
+    replayed = replay(InputLog.from_bytes(log.to_bytes()), verify=True)
+    assert replayed.ticks == game.ticks == TICKS
+    assert replayed.checksum() == game.checksum()
+
+
+def test_replay_detects_changed_inputs():
+    inputs = random_inputs(TICKS)
+    _, log = record(inputs)
+    changed = [INPUT_LEFT] * 30 + inputs[30:]
+    assert changed != inputs
+    tampered = InputLog(SEED, bytes(changed), log.checksum_every, log.checksums)
+    with pytest.raises(ReplayDesyncError):
+        replay(tampered, verify=True)
+
+
+def test_replay_rejects_other_versions():
+    blob = bytearray(record(random_inputs(10))[1].to_bytes())
+    blob[4] += 1
+    with pytest.raises(ValueError, match="unsupported input log version"):
+        InputLog.from_bytes(bytes(blob))
+
+
+def state(game):
+    # Decoded snapshot, comparable even where marshal output bytes are not.
+    # The player's attributes are read directly so fields the snapshot
+    # leaves out (like the render-only previous position) still count.
+    player = {name: value for name, value in vars(game.player).items() if name not in ("fx_rng", "events")}
+    return marshal.loads(snapshot(game)[HEADER.size:]), player, game.player.fx_rng.getstate()
+
+
+def continue_from_snapshot(target=None):
+    inputs = random_inputs(TICKS)
+    middle = TICKS // 2
+    game = Game(seed=SEED)
+    game.step(middle, inputs)
+    restored = restore(snapshot(game), target)
+    assert state(restored) == state(game)
+    for tick_inputs in inputs[middle:]:
+        game.tick(tick_inputs)
+        restored.tick(tick_inputs)
+        assert restored.checksum() == game.checksum()
+    assert state(restored) == state(game)
+    return restored
+
+
+def test_restore_into_new_game_continues_identically():
+    continue_from_snapshot()
+
+
+def test_restore_in_place_continues_identically():
+    target = Game(seed=SEED + 1)
+    target.step(TICKS // 3, random_inputs(TICKS // 3, seed=1))
+    assert continue_from_snapshot(target) is target
+
+
+def test_restore_rejects_corrupt_snapshots():
+    blob = snapshot(Game(seed=SEED))
+    with pytest.raises(SnapshotError):
+        restore(blob[:len(blob) // 2])